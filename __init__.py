@@ -1 +1,2 @@
+from . import controller
 from . import models
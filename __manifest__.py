@@ -9,12 +9,15 @@
     'data': [
         'data/ir_sequence_data.xml',
         'security/ir.model.access.csv',
+        'data/ir_cron_data.xml',
         'views/manpower_request_views.xml',
         'views/manpower_menu.xml',
         'views/pre_printed_form_views.xml',
         'views/overlay_text_item_views.xml',
         'views/overlay_config_item_views.xml',
         'views/ir_attachment_views.xml',
+        'views/pre_printed_form_job_views.xml',
+        'views/pre_printed_form_render_log_views.xml',
     ],
     'installable': True,
     'application': True,
@@ -0,0 +1,259 @@
+"""Benchmark of the overlay rendering pipeline.
+
+Runs the ORM-free rendering core (``tools.render``) against synthetic
+templates and layout plans, so no Odoo server or database is needed. Run
+it from the module directory::
+
+    python -m benchmarks.bench_render --items 10,80 --pages 1,20 --batch 1,100
+    python -m benchmarks.bench_render --save baseline.json
+    python -m benchmarks.bench_render --baseline baseline.json
+
+Every scenario is rendered ``--repeat`` times and the latency percentiles
+of each stage (template parse, font registration, overlay drawing, merge,
+write), the peak memory and the output size are reported. ``--save`` stores the results and
+``--baseline`` compares them with stored results, exiting with status 1
+when a stage got slower than ``--threshold`` and by more than
+``--min-delta`` milliseconds. Saving and comparing take ``COMPARE_REPEAT``
+runs per scenario unless ``--repeat`` is given, since a p50 of a handful
+of runs is too noisy to compare.
+"""
+import argparse
+import itertools
+import json
+import random
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from tools import fonts
+from tools import render
+from tools.layout import DEFAULT_STYLE, LayoutPlan, PlanItem, RenderRecord, TextStyle
+from tools.template_cache import template_cache
+from tools.timing import StageTimer
+
+STAGES = ("template", "fonts", "draw", "merge", "write", "total")
+
+DEFAULT_REPEAT = 5
+COMPARE_REPEAT = 15
+
+FONT_MIXES = {
+    "standard": ["times", "helvetica", "courier"],
+    "ttf": ["arial", "calibri", "agency"],
+    "mixed": ["times", "helvetica", "courier", "arial", "calibri", "agency"],
+}
+
+
+def build_template(pages, scanned=False):
+    buffer = BytesIO()
+    template = canvas.Canvas(buffer, pagesize=letter, invariant=1)
+    rng = random.Random(pages)
+    for page in range(pages):
+        if scanned:
+            from PIL import Image
+
+            # same bytes as rng.randbytes(), which needs Python 3.9
+            noise = rng.getrandbits(850 * 1100 * 8).to_bytes(850 * 1100, "little")
+            image = Image.frombytes("L", (850, 1100), noise)
+            template.drawImage(ImageReader(image), 0, 0, *letter)
+        else:
+            for row in range(40):
+                y = 40 + row * 18
+                template.line(36, y, 576, y)
+                template.setFont("Helvetica", 7)
+                template.drawString(40, y + 2, f"Field label {page}.{row}")
+        template.showPage()
+    template.save()
+    return buffer.getvalue()
+
+
+def build_plan(items, font_mix, underline, share_template=False):
+    rng = random.Random(items)
+    styles = {}
+    for index, font_style in enumerate(FONT_MIXES[font_mix]):
+        for bold, italic in itertools.product((False, True), repeat=2):
+            font_name = fonts.resolve_font_name(font_style, bold, italic)
+            styles[len(styles) + 1] = TextStyle(
+                fonts.font_registry.ensure(font_name),
+                rng.choice((8, 10, 12)),
+                rng.random() < underline,
+            )
+    plan_items = tuple(
+        PlanItem(0, rng.uniform(36, 500), rng.uniform(36, 740), styles[rng.choice(list(styles))], "static", f"f{index}")
+        for index in range(items)
+    )
+    return LayoutPlan(
+        version=1,
+        page_size=letter,
+        styles=styles,
+        style_names={},
+        items=plan_items,
+        field_paths=tuple(item.field_path for item in plan_items),
+        font_names=frozenset(style.font_name for style in styles.values()) | {DEFAULT_STYLE.font_name},
+        share_template=share_template,
+    )
+
+
+def build_records(plan, batch):
+    return [
+        RenderRecord({path: f"Value {record} {path}" for path in plan.field_paths}, ())
+        for record in range(batch)
+    ]
+
+
+def run_once(template_data, plan, records):
+    timer = StageTimer()
+    template_cache.clear()
+    with timer.stage("template"):
+        template = render.load_template(template_data)
+    data = render.render_pdf(template, plan, records, timer)
+    timings = dict.fromkeys(STAGES, 0.0)
+    timings.update(timer.timings)
+    timings["total"] = timer.total()
+    return timings, len(data)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def run_scenario(scenario, repeat):
+    template_data = build_template(scenario["pages"], scenario["scanned"])
+    plan = build_plan(scenario["items"], scenario["fonts"], scenario["underline"], scenario["shared"])
+    records = build_records(plan, scenario["batch"])
+
+    # warm-up run, also used to measure the peak memory of one render
+    tracemalloc.start()
+    _timings, size = run_once(template_data, plan, records)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    samples = {stage: [] for stage in STAGES}
+    for _index in range(repeat):
+        timings, size = run_once(template_data, plan, records)
+        for stage in STAGES:
+            samples[stage].append(timings[stage])
+
+    return {
+        "scenario": scenario,
+        "stages": {
+            stage: {
+                "p50": percentile(values, 0.5),
+                "p95": percentile(values, 0.95),
+                "max": max(values),
+            }
+            for stage, values in samples.items()
+        },
+        "peak_memory": peak_memory,
+        "output_size": size,
+    }
+
+
+def scenario_name(scenario):
+    name = "items={items} pages={pages} fonts={fonts} underline={underline} batch={batch}".format(**scenario)
+    if scenario["scanned"]:
+        name += " scanned"
+    if scenario.get("shared"):
+        name += " shared"
+    return name
+
+
+def print_result(result):
+    print(scenario_name(result["scenario"]))
+    for stage in STAGES:
+        timing = result["stages"][stage]
+        print(f"  {stage:<9} p50 {timing['p50'] * 1000:9.2f} ms  p95 {timing['p95'] * 1000:9.2f} ms"
+              f"  max {timing['max'] * 1000:9.2f} ms")
+    print(f"  peak memory {result['peak_memory'] / 1024 / 1024:.1f} MiB, output {result['output_size'] / 1024:.1f} KiB")
+
+
+def compare(results, baseline, threshold, min_delta=0.001):
+    """Return the stages whose p50 got slower than ``threshold`` (relative)
+    and by more than ``min_delta`` seconds, which keeps the jitter of
+    sub-millisecond stages out of the report."""
+    previous = {scenario_name(result["scenario"]): result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        name = scenario_name(result["scenario"])
+        if name not in previous:
+            continue
+        for stage in STAGES:
+            before = previous[name]["stages"][stage]["p50"]
+            after = result["stages"][stage]["p50"]
+            if before and after > before * (1 + threshold) and after - before > min_delta:
+                regressions.append(f"{name}: {stage} p50 {before * 1000:.2f} ms -> {after * 1000:.2f} ms")
+    return regressions
+
+
+def parse_list(value, cast):
+    return [cast(part) for part in value.split(",") if part]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--items", default="10,80", help="text items per form")
+    parser.add_argument("--pages", default="1,5", help="template pages")
+    parser.add_argument("--fonts", default="standard,ttf", help=f"font mixes among {', '.join(FONT_MIXES)}")
+    parser.add_argument("--underline", default="0,0.5", help="share of underlined styles")
+    parser.add_argument("--batch", default="1,50", help="records per batch")
+    parser.add_argument("--scanned", action="store_true", help="use image (scanned) templates")
+    parser.add_argument("--shared", action="store_true", help="embed template pages once as shared XObjects")
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        help=f"measured runs per scenario ({DEFAULT_REPEAT}, or {COMPARE_REPEAT} with --save or --baseline)",
+    )
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with results saved by --save")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed p50 slowdown against the baseline")
+    parser.add_argument(
+        "--min-delta",
+        type=float,
+        default=1.0,
+        help="smallest p50 slowdown in milliseconds reported as a regression",
+    )
+    args = parser.parse_args(argv)
+    repeat = args.repeat or (COMPARE_REPEAT if args.save or args.baseline else DEFAULT_REPEAT)
+
+    results = []
+    for items, pages, font_mix, underline, batch in itertools.product(
+        parse_list(args.items, int),
+        parse_list(args.pages, int),
+        parse_list(args.fonts, str),
+        parse_list(args.underline, float),
+        parse_list(args.batch, int),
+    ):
+        scenario = {
+            "items": items,
+            "pages": pages,
+            "fonts": font_mix,
+            "underline": underline,
+            "batch": batch,
+            "scanned": args.scanned,
+            "shared": args.shared,
+        }
+        result = run_scenario(scenario, repeat)
+        print_result(result)
+        results.append(result)
+
+    if args.save:
+        with open(args.save, "w") as output:
+            json.dump({"created": time.time(), "results": results}, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.threshold, args.min_delta / 1000.0)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+from odoo import http
+from odoo.exceptions import UserError
+from odoo.http import content_disposition, request
+from werkzeug.exceptions import BadRequest
+from werkzeug.http import quote_etag
+from werkzeug.wsgi import wrap_file
+
+from ..tools import timing
+
+
+class PrePrintedFormController(http.Controller):
+
+    @http.route("/pre_printed_form/<int:form_id>/render", type="http", auth="user", methods=["GET"])
+    def render(self, form_id, ids="", output_type=None, download=None, **kwargs):
+        form = request.env["pre.printed.form"].browse(form_id).exists()
+        if not form:
+            raise request.not_found()
+        try:
+            record_ids = [int(record_id) for record_id in ids.split(",") if record_id]
+        except ValueError:
+            raise BadRequest("ids must be a comma separated list of record ids")
+        try:
+            records = form._get_target_records(record_ids)
+        except UserError:
+            raise request.not_found()
+
+        output_type = output_type or (form.batch_output if len(records) > 1 else "pdf")
+        timer = timing.StageTimer()
+        with timing.profiled(form.profile_next_render) as profiler:
+            # the values are resolved before the ETag check: the output
+            # depends on them, on the user's language and on dotted paths
+            prepared = form._prepare_render(records, timer)
+            etag = form._get_output_cache_key(records, output_type, prepared)
+            if request.httprequest.if_none_match.contains(etag):
+                request.env["pre.printed.form.render.log"]._log(
+                    form, records, output_type, timer, 0, cache_hit=True
+                )
+                return request.make_response(b"", headers=[("ETag", quote_etag(etag))], status=304)
+            output, mimetype, file_name = form._render_file(records, output_type, prepared, timer)
+        size = output.seek(0, 2)
+        output.seek(0)
+        request.env["pre.printed.form.render.log"]._log(form, records, output_type, timer, size, profiler=profiler)
+        disposition = content_disposition(file_name)
+        if not download:
+            disposition = disposition.replace("attachment", "inline", 1)
+        # the spooled file is sent in blocks and closed once the response is done
+        response = request.make_response(wrap_file(request.httprequest.environ, output), headers=[
+            ("Content-Type", mimetype),
+            ("Content-Length", size),
+            ("Content-Disposition", disposition),
+            ("ETag", quote_etag(etag)),
+            ("Cache-Control", "private, no-cache"),
+        ])
+        response.direct_passthrough = True
+        return response
+
+    @http.route("/pre_printed_form/<int:form_id>/preview", type="http", auth="user", methods=["GET"])
+    def preview(self, form_id, page="1", format="png", dpi="96", res_id=None, **kwargs):
+        form = request.env["pre.printed.form"].browse(form_id).exists()
+        if not form:
+            raise request.not_found()
+        try:
+            page_number, dpi = int(page), min(max(int(dpi), 36), 300)
+            record_id = int(res_id) if res_id else None
+        except ValueError:
+            raise BadRequest("page, dpi and res_id must be integers")
+        if format not in ("png", "pdf"):
+            raise BadRequest("format must be png or pdf")
+
+        record = form.env[form.model_id.model].browse(record_id).exists() if record_id and form.model_id else None
+        try:
+            prepared = form._prepare_preview(page_number, record and record.id)
+            etag = form._get_preview_etag(page_number, format, dpi, prepared)
+            if request.httprequest.if_none_match.contains(etag):
+                return request.make_response(b"", headers=[("ETag", quote_etag(etag))], status=304)
+            data, mimetype = form._render_preview(page_number, format, dpi, prepared)
+        except UserError as e:
+            raise BadRequest(str(e))
+        return request.make_response(data, headers=[
+            ("Content-Type", mimetype),
+            ("Content-Length", len(data)),
+            ("ETag", quote_etag(etag)),
+            ("Cache-Control", "private, no-cache"),
+        ])
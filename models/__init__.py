@@ -1,4 +1,7 @@
 from . import pre_printed_form
+from . import pre_printed_form_job
+from . import pre_printed_form_output
+from . import pre_printed_form_render_log
 from . import overlay_test_item
 from . import overlay_configuration_item
 from . import manpower_request
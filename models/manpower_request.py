@@ -1,7 +1,25 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api
-from datetime import datetime, date
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.tools import split_every
+from collections import defaultdict
+from datetime import datetime
+import time
+
+# Statuses whose duration keeps growing until the request is decided
+OPEN_STATUSES = ('draft', 'for_approval', 'on_hold')
+
+# Statuses a request may come from, by target status
+STATUS_TRANSITIONS = {
+    'for_approval': ('draft',),
+    'approved': ('for_approval',),
+    'rejected': ('for_approval', 'on_hold'),
+    'on_hold': ('for_approval',),
+    'draft': ('rejected', 'on_hold'),
+}
+
+TRANSITION_CHUNK_SIZE = 500
 
 
 class ManpowerRequest(models.Model):
@@ -30,7 +48,9 @@ class ManpowerRequest(models.Model):
         string='Duration (Days)',
         compute='_compute_duration_days',
         store=True,
-        help='Number of days since the request was created'
+        index=True,
+        help='Number of days since the request was created. '
+             'Refreshed every night for open requests and frozen once the request is decided.'
     )
     
     request_type = fields.Selection([
@@ -46,7 +66,7 @@ class ManpowerRequest(models.Model):
         ('approved', 'Approved'),
         ('rejected', 'Rejected'),
         ('on_hold', 'On Hold')
-    ], string='Request Status', default='draft', required=True, tracking=True)
+    ], string='Request Status', default='draft', required=True, index=True, tracking=True)
     
     urgency_level = fields.Selection([
         ('low', 'Low'),
@@ -145,31 +165,164 @@ class ManpowerRequest(models.Model):
         tracking=True
     )
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        new_vals = [vals for vals in vals_list if vals.get('name', _('New')) == _('New')]
+        if new_vals:
+            for vals, name in zip(new_vals, self._next_request_names(len(new_vals))):
+                vals['name'] = name
+        if self.env.context.get('import_file'):
+            return self._create_imported(vals_list)
+        return super(ManpowerRequest, self).create(vals_list)
+
     @api.model
-    def create(self, vals):
-        if vals.get('name', _('New')) == _('New'):
-            vals['name'] = self.env['ir.sequence'].next_by_code('manpower.request') or _('New')
-        return super(ManpowerRequest, self).create(vals)
+    def _next_request_names(self, count):
+        """Reserve ``count`` requisition numbers of the manpower.request
+        sequence at once instead of one next_by_code call per record."""
+        sequence = self.env['ir.sequence'].sudo().search([
+            ('code', '=', 'manpower.request'),
+            ('company_id', 'in', [self.env.company.id, False]),
+        ], order='company_id', limit=1)
+        if not sequence:
+            return [_('New')] * count
+        if sequence.use_date_range:
+            return [sequence.next_by_id() for _index in range(count)]
+        if sequence.implementation == 'standard':
+            self.env.cr.execute(
+                "SELECT nextval(%s) FROM generate_series(1, %s)",
+                ('ir_sequence_%03d' % sequence.id, count),
+            )
+            numbers = [row[0] for row in self.env.cr.fetchall()]
+        else:
+            self.env.cr.execute(
+                "UPDATE ir_sequence SET number_next = number_next + %s * number_increment "
+                "WHERE id = %s RETURNING number_next - %s * number_increment, number_increment",
+                (count, sequence.id, count),
+            )
+            first, increment = self.env.cr.fetchone()
+            sequence.invalidate_recordset(['number_next'])
+            numbers = [first + index * increment for index in range(count)]
+        return [sequence.get_next_char(number) for number in numbers]
 
-    @api.depends('date_requested')
+    def _create_imported(self, vals_list):
+        """Import mode: create the requests without any chatter, then log
+        one message per request and add the followers in a few batches."""
+        records = super(ManpowerRequest, self.with_context(
+            tracking_disable=True,
+            mail_create_nolog=True,
+            mail_create_nosubscribe=True,
+        )).create(vals_list)
+        records._message_log_batch(
+            bodies={record.id: _('Manpower request imported.') for record in records},
+        )
+        records.message_subscribe(partner_ids=self.env.user.partner_id.ids)
+        request_ids_by_user = defaultdict(list)
+        for record in records:
+            request_ids_by_user[record.requested_by].append(record.id)
+        for user, request_ids in request_ids_by_user.items():
+            self.browse(request_ids).message_subscribe(partner_ids=user.partner_id.ids)
+        return records
+
+    @api.depends('date_requested', 'request_status')
     def _compute_duration_days(self):
         for record in self:
             if record.date_requested:
-                today = date.today()
+                # same "today" as _cron_refresh_duration_days
+                today = fields.Date.today()
                 delta = today - record.date_requested
                 record.duration_days = delta.days
             else:
                 record.duration_days = 0
 
-    def action_submit_for_approval(self):
-        self.write({
-            'request_status': 'for_approval'
+    @api.model
+    def _cron_refresh_duration_days(self):
+        """Bring duration_days of all open requests up to date with one UPDATE.
+
+        Today is taken from the server like in the compute, not from
+        CURRENT_DATE of the database session, so both always agree.
+        """
+        self.flush_model(['date_requested', 'request_status'])
+        today = fields.Date.today()
+        self.env.cr.execute("""
+            UPDATE manpower_request
+               SET duration_days = %(today)s - date_requested
+             WHERE request_status IN %(statuses)s
+               AND date_requested IS NOT NULL
+               AND duration_days IS DISTINCT FROM %(today)s - date_requested
+        """, {'today': today, 'statuses': OPEN_STATUSES})
+        self.invalidate_model(['duration_days'])
+        return self.env.cr.rowcount
+
+    def _bulk_transition(self, status, vals=None):
+        """Move all requests of self to ``status`` and return the time taken.
+
+        The current statuses are checked against STATUS_TRANSITIONS in one
+        query. A single request is written with the usual field tracking,
+        so its chatter shows every changed field. Several requests are
+        written in chunks without field tracking, and each of them gets a
+        single log message for the change instead.
+        """
+        start = time.perf_counter()
+        if not self:
+            return 0.0
+        self.flush_recordset(['request_status'])
+        self.env.cr.execute("""
+            SELECT id, name, request_status, request_status IN %s
+              FROM manpower_request
+             WHERE id IN %s
+        """, (STATUS_TRANSITIONS[status], tuple(self.ids)))
+        rows = self.env.cr.fetchall()
+        invalid = [name for _id, name, _status, allowed in rows if not allowed]
+        status_labels = dict(self._fields['request_status']._description_selection(self.env))
+        if invalid:
+            raise UserError(_(
+                'These requests can not be set to %(status)s: %(requests)s',
+                status=status_labels[status],
+                requests=', '.join(invalid[:20]) + (' ...' if len(invalid) > 20 else ''),
+            ))
+
+        vals = dict(vals or {}, request_status=status)
+        if len(self) == 1:
+            self.write(vals)
+            return time.perf_counter() - start
+        requests = self.with_context(tracking_disable=True)
+        for request_ids in split_every(TRANSITION_CHUNK_SIZE, self.ids):
+            requests.browse(request_ids).write(vals)
+        message = _('Status changed from %(old)s to %(new)s, with %(count)s requests at once.')
+        self._message_log_batch(bodies={
+            request_id: message % {
+                'old': status_labels[old_status],
+                'new': status_labels[status],
+                'count': len(self),
+            }
+            for request_id, _name, old_status, _allowed in rows
         })
+        return time.perf_counter() - start
+
+    def _bulk_transition_notification(self, status, duration):
+        status_labels = dict(self._fields['request_status']._description_selection(self.env))
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Manpower Requests'),
+                'message': _(
+                    '%(count)s requests set to %(status)s in %(duration).2f seconds.',
+                    count=len(self),
+                    status=status_labels[status],
+                    duration=duration,
+                ),
+                'type': 'success',
+                'next': {'type': 'ir.actions.act_window_close'},
+            },
+        }
+
+    def action_submit_for_approval(self):
+        self._bulk_transition('for_approval')
         return True
 
     def action_approve(self):
-        self.write({
-            'request_status': 'approved',
+        self._bulk_transition('approved', {
             'approved_by': self.env.user.id,
             'approval_date': fields.Datetime.now()
         })
@@ -182,22 +335,42 @@ class ManpowerRequest(models.Model):
             'res_model': 'manpower.request.reject.wizard',
             'view_mode': 'form',
             'target': 'new',
-            'context': {'default_request_id': self.id}
+            'context': {'default_request_ids': self.ids}
         }
 
     def action_hold(self):
-        self.write({'request_status': 'on_hold'})
+        self._bulk_transition('on_hold')
         return True
 
     def action_reset_to_draft(self):
-        self.write({
-            'request_status': 'draft',
+        self._bulk_transition('draft', {
             'approved_by': False,
             'approval_date': False,
             'rejection_reason': False
         })
         return True
 
+    def action_bulk_submit_for_approval(self):
+        return self._bulk_transition_notification('for_approval', self._bulk_transition('for_approval'))
+
+    def action_bulk_approve(self):
+        duration = self._bulk_transition('approved', {
+            'approved_by': self.env.user.id,
+            'approval_date': fields.Datetime.now()
+        })
+        return self._bulk_transition_notification('approved', duration)
+
+    def action_bulk_hold(self):
+        return self._bulk_transition_notification('on_hold', self._bulk_transition('on_hold'))
+
+    def action_bulk_reset_to_draft(self):
+        duration = self._bulk_transition('draft', {
+            'approved_by': False,
+            'approval_date': False,
+            'rejection_reason': False
+        })
+        return self._bulk_transition_notification('draft', duration)
+
     @api.model
     def _get_urgency_color(self):
         color_map = {
@@ -224,12 +397,20 @@ class ManpowerRequestRejectWizard(models.TransientModel):
     _name = 'manpower.request.reject.wizard'
     _description = 'Manpower Request Rejection Wizard'
 
-    request_id = fields.Many2one('manpower.request', string='Request', required=True)
+    request_id = fields.Many2one('manpower.request', string='Request')
+    request_ids = fields.Many2many('manpower.request', string='Requests', required=True)
     rejection_reason = fields.Text(string='Rejection Reason', required=True)
 
+    @api.model
+    def default_get(self, fields_list):
+        res = super(ManpowerRequestRejectWizard, self).default_get(fields_list)
+        if 'request_ids' in fields_list and not res.get('request_ids') and res.get('request_id'):
+            res['request_ids'] = [(6, 0, [res['request_id']])]
+        return res
+
     def action_reject(self):
-        self.request_id.write({
-            'request_status': 'rejected',
-            'rejection_reason': self.rejection_reason
-        })
+        requests = self.request_ids
+        duration = requests._bulk_transition('rejected', {'rejection_reason': self.rejection_reason})
+        if len(requests) > 1:
+            return requests._bulk_transition_notification('rejected', duration)
         return {'type': 'ir.actions.act_window_close'}
\ No newline at end of file
@@ -1,4 +1,5 @@
-from odoo import models, fields
+from odoo import models, fields, api
+from odoo.exceptions import ValidationError
 
 class OverlayConfigurationItem(models.Model):
     _name = 'overlay.config.item'
@@ -27,3 +28,46 @@ class OverlayConfigurationItem(models.Model):
     bold = fields.Boolean(string='Bold', help='Apply Bold font format for the overlay text.')
     italic = fields.Boolean(string='Italic', help='Apply Italic/Oblique font format for the overlay text.')
     underline = fields.Boolean(string='Underline', help='Apply Underline font format for the overlay text.')
+    wrap = fields.Boolean(string='Wrap', help='Wrap the text at word boundaries to the width of the text box.')
+    align = fields.Selection([
+        ('left', 'Left'),
+        ('center', 'Center'),
+        ('right', 'Right')],
+        string='Alignment',
+        default='left',
+        required=True,
+        help='Alignment of the text in the width of the text box.'
+    )
+    shrink_to_fit = fields.Boolean(
+        string='Shrink to Fit',
+        help='Reduce the font size, down to the minimum font size, until the text fits its text box.',
+    )
+    min_font_size = fields.Integer(string='Minimum Font Size', default=6, help='Smallest font size used by Shrink to Fit.')
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records.form_id._bump_layout_version()
+        return records
+
+    @api.constrains('min_font_size')
+    def _check_min_font_size(self):
+        for record in self:
+            if record.min_font_size < 1:
+                raise ValidationError("Minimum font size must be at least 1.")
+
+    def _get_dependent_forms(self):
+        text_items = self.env['overlay.text.item'].search([('config_id', 'in', self.ids)])
+        return self.form_id | text_items.form_id
+
+    def write(self, vals):
+        forms = self._get_dependent_forms()
+        res = super().write(vals)
+        (forms | self.form_id)._bump_layout_version()
+        return res
+
+    def unlink(self):
+        forms = self._get_dependent_forms()
+        res = super().unlink()
+        forms.exists()._bump_layout_version()
+        return res
@@ -15,6 +15,21 @@ class OverlayTextItem(models.Model):
     )
     x = fields.Float(string='X Coordinate', required=True)
     y = fields.Float(string='Y Coordinate', required=True)
+    page = fields.Integer(
+        string='Page',
+        default=0,
+        help='Template page the item is printed on. Leave 0 to print it on every page.',
+    )
+    width = fields.Float(
+        string='Box Width',
+        help='Width of the text box from the X coordinate. Text is aligned, wrapped and shrunk '
+             'in the box according to its config item. Leave 0 for no limit.',
+    )
+    height = fields.Float(
+        string='Box Height',
+        help='Height of the text box from the top of the first line. Lines that do not fit are '
+             'not printed. Leave 0 for no limit.',
+    )
     text = fields.Char(string='Fallback/Static Text')
     config_id = fields.Many2one(
         comodel_name='overlay.config.item',
@@ -24,6 +39,29 @@ class OverlayTextItem(models.Model):
         comodel_name='ir.model.fields',
         string='Dynamic Text (From Field)',
     )
+    field_path = fields.Char(
+        string='Field Path',
+        help='Dotted path read from the printed record, e.g. employee_id.department_id.name. '
+             'Takes precedence over Dynamic Text.',
+    )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records.form_id._bump_layout_version()
+        return records
+
+    def write(self, vals):
+        forms = self.form_id
+        res = super().write(vals)
+        (forms | self.form_id)._bump_layout_version()
+        return res
+
+    def unlink(self):
+        forms = self.form_id
+        res = super().unlink()
+        forms.exists()._bump_layout_version()
+        return res
 
     @api.constrains('x', 'y')
     def _check_coordinates(self):
@@ -31,5 +69,23 @@ class OverlayTextItem(models.Model):
             if record.x < 0 or record.y < 0:
                 raise ValidationError("Coordinates must be non-negative.")
 
+    @api.constrains('width', 'height')
+    def _check_box(self):
+        for record in self:
+            if record.width < 0 or record.height < 0:
+                raise ValidationError("Box width and height must be non-negative.")
+
+    @api.constrains('page')
+    def _check_page(self):
+        for record in self:
+            if record.page < 0:
+                raise ValidationError("Page must be 0 (every page) or a page number.")
+
+    @api.constrains('field_path', 'form_id')
+    def _check_field_path(self):
+        for record in self:
+            if record.field_path and record.form_id.model_id:
+                record.form_id._get_field_path_fields(record.field_path)
+
     def name_get(self):
         return [(rec.id, f"{rec.name} ({rec.x:.1f}, {rec.y:.1f})") for rec in self]
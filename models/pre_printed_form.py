@@ -1,13 +1,39 @@
 from odoo import models, fields, api
-from odoo.exceptions import UserError
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools.safe_eval import (
+    _BUILTINS,
+    _SAFE_OPCODES,
+    check_values,
+    datetime,
+    dateutil,
+    test_expr,
+    time,
+    unsafe_eval,
+)
 from reportlab.lib.pagesizes import letter, legal, A3, A4
-from reportlab.pdfgen import canvas
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfbase import pdfmetrics
-import PyPDF2
-from io import BytesIO
 import base64
-from odoo.modules import get_module_path
+import hashlib
+import pytz
+from ..tools import fonts
+from ..tools import formatters
+from ..tools import pool
+from ..tools import preview
+from ..tools import render
+from ..tools import timing
+from ..tools.layout import DEFAULT_STYLE, LayoutPlan, PlanItem, RenderRecord, TextStyle, layout_cache
+from ..tools.template_cache import template_cache
+
+TEMPLATE_CACHE_SIZE_PARAM = "pre_printed_forms.template_cache_size_mb"
+RENDER_PROCESSES_PARAM = "pre_printed_forms.render_processes"
+SPOOL_THRESHOLD_PARAM = "pre_printed_forms.spool_threshold_mb"
+
+LAYOUT_FIELDS = {"page_size", "model_id", "text_item_ids", "config_item_ids", "code", "share_template_pages"}
+
+# compiled custom code per (database, form id): (layout version, mode, code object)
+_compiled_code = {}
+
+# names of the former per-record eval() scope: code using them runs once per record
+LEGACY_RECORD_NAMES = {"record_id", "record_container"}
 
 PAGE_SIZES = {
     "letter": letter,
@@ -18,6 +44,15 @@ PAGE_SIZES = {
     "half_sheet_vertical": (306, 396),
 }
 
+def _code_names(code_obj):
+    """Return the global names used by ``code_obj`` and the code nested in it."""
+    names = set(code_obj.co_names)
+    for const in code_obj.co_consts:
+        if isinstance(const, type(code_obj)):
+            names |= _code_names(const)
+    return names
+
+
 class PrePrintedForm(models.Model):
     _name = "pre.printed.form"
     _description = "Pre‑Printed Form"
@@ -69,192 +104,590 @@ class PrePrintedForm(models.Model):
         string="Model",
         help="Select a model related to this pre-printed form.",
     )
+    batch_output = fields.Selection(
+        selection=[
+            ("pdf", "Single PDF"),
+            ("zip", "ZIP of PDFs"),
+        ],
+        string="Batch Output",
+        required=True,
+        default="pdf",
+        help="Output produced when several records are printed at once.",
+    )
+    share_template_pages = fields.Boolean(
+        string="Share Template Pages",
+        default=True,
+        help="Embed every page of the input PDF once in a batch PDF and let each record's pages refer to it, "
+             "so the file grows with the printed text instead of the template size.",
+    )
+    store_output = fields.Boolean(
+        string="Store Output",
+        default=True,
+        help="Keep every generated file as an attachment of the form. "
+             "When unchecked the file is streamed to the browser without being stored.",
+    )
+    output_retention_days = fields.Integer(
+        string="Keep Outputs (Days)",
+        default=30,
+        help="Stored outputs and finished print jobs not used for this many days are deleted. "
+             "Set to 0 to keep them regardless of age.",
+    )
+    output_retention_count = fields.Integer(
+        string="Keep Outputs (Count)",
+        default=0,
+        help="Only the most recently used stored outputs of the form are kept. Set to 0 for no limit.",
+    )
+    queue_threshold = fields.Integer(
+        string="Background Above",
+        default=500,
+        help="Selections with more records than this are rendered by a background print job. "
+             "Set to 0 to always print immediately.",
+    )
+    queue_chunk_size = fields.Integer(
+        string="Job Chunk Size",
+        default=100,
+        help="Number of records rendered together by a background print job.",
+    )
     code = fields.Text(
         string="Custom Code",
-        help="This field will be used to call a custom function that will return a list of x, y, and text",
+        help="Python code run once per print under the safe_eval sandbox with the printed records in `records`. "
+             "It evaluates to (or assigns to `result`) a list of dicts with x, y, text and optional page and config "
+             "printed on every record, or a dict of such lists keyed by record id. Code written for the former "
+             "per-record scope (record_id, record_container) still runs, once per printed record.",
+    )
+    output_ids = fields.One2many(
+        comodel_name="pre.printed.form.output",
+        inverse_name="form_id",
+        string="Generated Outputs",
     )
+    output_cache_hits = fields.Integer(string="Output Cache Hits", compute="_compute_output_cache_stats")
+    output_cache_misses = fields.Integer(string="Output Cache Misses", compute="_compute_output_cache_stats")
+    profile_next_render = fields.Boolean(
+        string="Profile Next Print",
+        copy=False,
+        help="Run the next print of this form under cProfile and attach the dump to its render log.",
+    )
+    render_log_ids = fields.One2many(
+        comodel_name="pre.printed.form.render.log",
+        inverse_name="form_id",
+        string="Render Logs",
+    )
+    layout_version = fields.Integer(
+        string="Layout Version",
+        default=1,
+        readonly=True,
+        copy=False,
+        help="Incremented whenever the page size, text items or config items change.",
+    )
+
+    def _compute_output_cache_stats(self):
+        groups = self.env["pre.printed.form.output"].read_group(
+            [("form_id", "in", self.ids)],
+            ["form_id", "hit_count:sum", "miss_count:sum"],
+            ["form_id"],
+        )
+        stats = {group["form_id"][0]: group for group in groups}
+        for form in self:
+            group = stats.get(form.id, {})
+            form.output_cache_hits = group.get("hit_count", 0)
+            form.output_cache_misses = group.get("miss_count", 0)
+
+    def write(self, vals):
+        res = super().write(vals)
+        if LAYOUT_FIELDS.intersection(vals):
+            self._bump_layout_version()
+        return res
+
+    def _bump_layout_version(self):
+        if not self:
+            return
+        self.env.cr.execute(
+            "UPDATE pre_printed_form SET layout_version = layout_version + 1 WHERE id IN %s",
+            (tuple(self.ids),),
+        )
+        self.invalidate_recordset(["layout_version"])
 
     @api.model
-    def _register_fonts(self):
-        try:
-            module_path = get_module_path('pre-printed-forms-writer')
-            font_folder = f"{module_path}/static/fonts/"
-
-            # AgencyFB font variants
-            pdfmetrics.registerFont(TTFont('AGENCYFB', font_folder + 'AGENCYFB.ttf'))
-            pdfmetrics.registerFont(TTFont('AGENCYFB-Bold', font_folder + 'AGENCYFB-Bold.ttf'))
-            pdfmetrics.registerFont(TTFont('AGENCYFB-Italic', font_folder + 'AGENCYFB-Italic.ttf'))
-            pdfmetrics.registerFont(TTFont('AGENCYFB-BoldItalic', font_folder + 'AGENCYFB-BoldItalic.ttf'))
-
-            # Calibri font variants
-            pdfmetrics.registerFont(TTFont('Calibri', font_folder + 'CALIBRI.ttf'))
-            pdfmetrics.registerFont(TTFont('Calibri-Bold', font_folder + 'CALIBRI-Bold.ttf'))
-            pdfmetrics.registerFont(TTFont('Calibri-Italic', font_folder + 'CALIBRI-Italic.ttf'))
-            pdfmetrics.registerFont(TTFont('Calibri-BoldItalic', font_folder + 'CALIBRI-BoldItalic.ttf'))
-
-            # Arial font variants
-            pdfmetrics.registerFont(TTFont('Arial', font_folder + 'ARIAL.ttf'))
-            pdfmetrics.registerFont(TTFont('Arial-Bold', font_folder + 'ARIAL-Bold.ttf'))
-            pdfmetrics.registerFont(TTFont('Arial-Italic', font_folder + 'ARIAL-Italic.ttf'))
-            pdfmetrics.registerFont(TTFont('Arial-BoldItalic', font_folder + 'ARIAL-BoldItalic.ttf'))
+    def _register_fonts(self, font_names=None):
+        return fonts.font_registry.warm(font_names)
 
-        except Exception as e:
-            self.env['ir.logging'].sudo().create({
-                'name': 'Font Registration',
-                'type': 'server',
-                'level': 'warning',
-                'message': f'Failed to register custom fonts: {str(e)}',
-                'path': 'pre.printed.form',
-                'func': '_register_fonts',
-                'line': 1,
-            })
+    @api.model
+    def get_font_registry_stats(self):
+        return fonts.font_registry.stats()
+
+    def _get_template(self):
+        self.ensure_one()
+        attachment = self.input_pdf_attachment_id
+        size_mb = self.env["ir.config_parameter"].sudo().get_param(TEMPLATE_CACHE_SIZE_PARAM, 64)
+        template_cache.set_max_bytes(int(size_mb) * 1024 * 1024)
+        return template_cache.get(attachment.checksum, lambda: attachment.raw)
 
     def upload_pdf(self, pdf_data, pdf_name):
+        """Attach ``pdf_data`` (PDF bytes, or base64 text as sent by the client) as input PDF."""
+        if isinstance(pdf_data, str):
+            pdf_data = base64.b64decode(pdf_data)
         for record in self:
             if not pdf_data:
                 raise UserError("Please upload a PDF file before processing.")
+            if record.input_pdf_attachment_id:
+                template_cache.discard(record.input_pdf_attachment_id.checksum)
             attachment = self.env["ir.attachment"].create({
                 "name": pdf_name,
                 "type": "binary",
-                "datas": pdf_data,
+                "raw": pdf_data,
                 "mimetype": "application/pdf",
                 "res_model": self._name,
                 "res_id": record.id,
             })
             record.input_pdf_attachment_id = attachment
 
-    def process_action(self, record_id):
-        self._register_fonts()
-        record_container = self.env[self.model_id.model].search([("id", "=", record_id)], limit=1)
-        if not record_container:
+    def _get_target_records(self, records):
+        if isinstance(records, models.BaseModel):
+            record_ids = records.ids
+        elif isinstance(records, int):
+            record_ids = [records]
+        else:
+            record_ids = list(records)
+        found = self.env[self.model_id.model].search([("id", "in", record_ids)])
+        if not found:
             raise UserError("Record not found")
-        if not self.input_pdf_attachment_id:
-            raise UserError("Please select a PDF file before processing.")
+        found_ids = set(found.ids)
+        return found.browse([record_id for record_id in record_ids if record_id in found_ids])
 
-        input_pdf_stream = BytesIO(base64.b64decode(self.input_pdf_attachment_id.datas))
-        input_pdf = PyPDF2.PdfFileReader(input_pdf_stream)
-
-        buffer = BytesIO()
-        overlay_pdf = canvas.Canvas(buffer, pagesize=PAGE_SIZES.get(self.page_size, letter))
-
-        style_map = {
-            "times": {
-                "normal": "Times-Roman",
-                "bold": "Times-Bold",
-                "italic": "Times-Italic",
-                "bold_italic": "Times-BoldItalic",
-            },
-            "helvetica": {
-                "normal": "Helvetica",
-                "bold": "Helvetica-Bold",
-                "italic": "Helvetica-Oblique",
-                "bold_italic": "Helvetica-BoldOblique",
-            },
-            "arial": {
-                "normal": "Arial",
-                "bold": "Arial-Bold",
-                "italic": "Arial-Italic",
-                "bold_italic": "Arial-BoldItalic",
-            },
-            "calibri": {
-                "normal": "Calibri",
-                "bold": "Calibri-Bold",
-                "italic": "Calibri-Italic",
-                "bold_italic": "Calibri-BoldItalic",
-            },
-            "agency": {
-                "normal": "AGENCYFB",
-                "bold": "AGENCYFB-Bold",
-                "italic": "AGENCYFB-Italic",
-                "bold_italic": "AGENCYFB-BoldItalic",
-            },
-            "courier": {
-                "normal": "Courier",
-                "bold": "Courier-Bold",
-                "italic": "Courier-Oblique",
-                "bold_italic": "Courier-BoldOblique",
-            },
-        }
+    def _get_layout_plan(self):
+        self.ensure_one()
+        key = (self.env.cr.dbname, self.id)
+        plan = layout_cache.get(key, self.layout_version)
+        if plan is None:
+            plan = self._compile_layout_plan()
+            layout_cache.put(key, plan)
+        return plan
 
+    def _compile_layout_plan(self):
+        """Resolve fonts, styles and field paths of the form into a ``LayoutPlan``."""
+        record_fields = self.env[self.model_id.model]._fields if self.model_id else {}
+        styles = {}
+        for config in self.config_item_ids | self.text_item_ids.config_id:
+            font_name = fonts.resolve_font_name(config.font_style, config.bold, config.italic)
+            styles[config.id] = TextStyle(
+                fonts.font_registry.ensure(font_name),
+                config.font_size or DEFAULT_STYLE.font_size,
+                bool(config.underline),
+                bool(config.wrap),
+                config.align or "left",
+                bool(config.shrink_to_fit),
+                config.min_font_size or DEFAULT_STYLE.min_font_size,
+            )
+
+        items = []
         for item in self.text_item_ids:
-            x = float(item.x)
-            y = float(item.y)
-            font_size = 12
-            font_name = "Times-Roman"
-            config = item.config_id
-            underline = False
-            if config:
-                bold = getattr(config, 'bold', False)
-                italic = getattr(config, 'italic', False)
-                underline = getattr(config, 'underline', False)
-
-                if bold and italic:
-                    font_format_key = "bold_italic"
-                elif bold:
-                    font_format_key = "bold"
-                elif italic:
-                    font_format_key = "italic"
-                else:
-                    font_format_key = "normal"
+            field_path = False
+            if self.model_id:
+                field_path = item.field_path or (item.field_id.name if item.field_id.name in record_fields else False)
+            items.append(PlanItem(
+                item.page,
+                float(item.x),
+                float(item.y),
+                styles.get(item.config_id.id, DEFAULT_STYLE),
+                item.text or "",
+                field_path,
+                float(item.width),
+                float(item.height),
+            ))
 
-                font_style_key = config.font_style or "times"
-                font_name = style_map.get(font_style_key, style_map["times"]).get(font_format_key, "Times-Roman")
-                font_size = config.font_size or 12
+        return LayoutPlan(
+            version=self.layout_version,
+            page_size=PAGE_SIZES.get(self.page_size, letter),
+            styles=styles,
+            style_names={config.name: styles[config.id] for config in self.config_item_ids},
+            items=tuple(items),
+            field_paths=tuple(sorted({item.field_path for item in items if item.field_path})),
+            font_names=frozenset(style.font_name for style in styles.values()) | {DEFAULT_STYLE.font_name},
+            share_template=self.share_template_pages,
+        )
 
+    def _get_compiled_code(self):
+        """Return ``(mode, code object)`` of the custom code, checked by the
+        safe_eval sandbox and compiled once per layout version."""
+        key = (self.env.cr.dbname, self.id)
+        cached = _compiled_code.get(key)
+        if cached and cached[0] == self.layout_version:
+            return cached[1], cached[2]
+        filename = f"<pre.printed.form({self.id}).code>"
+        try:
             try:
-                overlay_pdf.setFont(font_name, font_size)
-            except Exception:
-                overlay_pdf.setFont("Times-Roman", font_size)
+                mode, code_obj = "eval", test_expr(self.code, _SAFE_OPCODES, mode="eval", filename=filename)
+            except SyntaxError:
+                mode, code_obj = "exec", test_expr(self.code, _SAFE_OPCODES, mode="exec", filename=filename)
+        except Exception as e:
+            raise UserError(f"Error compiling custom code: {e}")
+        _compiled_code[key] = (self.layout_version, mode, code_obj)
+        return mode, code_obj
 
-            text_to_draw = item.text
-            if item.field_id and self.model_id:
-                record_object = self.env[self.model_id.model].search([("id", "=", record_id)], limit=1)
-                if record_object:
-                    field_name = item.field_id.name
-                    text_to_draw = getattr(record_object, field_name, item.text)
-            text_to_draw = str(text_to_draw) if text_to_draw is not None else ""
+    def _get_code_items(self, records, plan):
+        """Run the custom code once for the whole batch.
 
-            overlay_pdf.drawString(x, y, text_to_draw)
+        The code sees ``records`` and either evaluates to, or assigns to
+        ``result``, a list of items printed on every record or a dict of such
+        lists keyed by record id. Items are dicts with ``x``, ``y``, ``text``
+        and optionally ``page``, ``config`` (id or name of a config item), and
+        ``width`` and ``height`` of a text box.
+        Returns ``{record id: (PlanItem, ...)}``.
 
-            if underline:
-                text_width = overlay_pdf.stringWidth(text_to_draw, font_name, font_size)
-                overlay_pdf.line(x, y - 2, x + text_width, y - 2)
+        Code written for the former per-record ``eval()`` scope still works:
+        ``self`` is the form, and code referring to ``record_id`` or
+        ``record_container`` runs once per record with those names bound.
+        """
+        if not self.code or not self.code.strip():
+            return {}
+        mode, code_obj = self._get_compiled_code()
+        names = _code_names(code_obj)
+        if "overlay_pdf" in names:
+            raise UserError(
+                "Custom code can no longer draw on overlay_pdf. "
+                "Return the items to print instead, see the help of the Custom Code field."
+            )
+        context = {
+            "env": self.env,
+            "form": self,
+            "self": self,
+            "records": records,
+            "datetime": datetime,
+            "dateutil": dateutil,
+            "time": time,
+        }
+        check_values(context)
+        try:
+            if LEGACY_RECORD_NAMES & names:
+                items_by_record = {}
+                for record in records:
+                    record_context = dict(context, records=record, record_id=record.id, record_container=record)
+                    items_by_record.update(self._eval_code(mode, code_obj, record_context, record))
+            else:
+                items_by_record = self._eval_code(mode, code_obj, context, records)
+            return {
+                record_id: tuple(self._make_code_item(plan, item) for item in items)
+                for record_id, items in items_by_record.items()
+            }
+        except UserError:
+            raise
+        except Exception as e:
+            raise UserError(f"Error evaluating custom code: {e}")
 
-        if self.code:
-            try:
-                items = eval(self.code)
-                for item in items:
-                    overlay_pdf.drawString(item["x"], item["y"], item["text"])
-            except Exception as e:
-                raise UserError(f"Error evaluating custom code: {e}")
-
-        overlay_pdf.showPage()
-        overlay_pdf.save()
-        buffer.seek(0)
-        overlay_pdf_stream = buffer.read()
-        buffer.close()
-
-        output_pdf_stream = BytesIO()
-        output_pdf = PyPDF2.PdfFileWriter()
-        for page_number in range(len(input_pdf.pages)):
-            page = input_pdf.getPage(page_number)
-            overlay_page = PyPDF2.PdfFileReader(BytesIO(overlay_pdf_stream)).getPage(0)
-            page.mergePage(overlay_page)
-            output_pdf.addPage(page)
-        output_pdf.write(output_pdf_stream)
-        output_pdf_stream.seek(0)
-        pdf_data = output_pdf_stream.read()
-        output_pdf_stream.close()
+    @staticmethod
+    def _eval_code(mode, code_obj, context, records):
+        """Run the code in ``context`` and return its item lists keyed by record id."""
+        context["__builtins__"] = dict(_BUILTINS)
+        result = unsafe_eval(code_obj, context)
+        if mode == "exec":
+            result = context.get("result")
+        if isinstance(result, dict):
+            return {
+                key.id if isinstance(key, models.BaseModel) else key: items
+                for key, items in result.items()
+            }
+        items = list(result or [])
+        return {record.id: items for record in records}
+
+    @staticmethod
+    def _make_code_item(plan, item):
+        config = item.get("config")
+        if isinstance(config, models.BaseModel):
+            config = config.id
+        style = None
+        if config:
+            style = plan.styles.get(config) if isinstance(config, int) else plan.style_names.get(config)
+            if style is None:
+                raise UserError(f"Custom code refers to unknown config item {config!r}.")
+        return PlanItem(
+            int(item.get("page", 0)),
+            float(item["x"]),
+            float(item["y"]),
+            style,
+            item["text"],
+            False,
+            float(item.get("width", 0)),
+            float(item.get("height", 0)),
+        )
+
+    def _get_field_path_fields(self, path):
+        model = self.env[self.model_id.model]
+        names = path.split(".")
+        path_fields = []
+        for index, name in enumerate(names):
+            field = model._fields.get(name)
+            if field is None:
+                raise ValidationError(f"Invalid field path {path}: {model._name} has no field {name}.")
+            if index < len(names) - 1:
+                if not field.relational:
+                    raise ValidationError(f"Invalid field path {path}: {name} is not a relational field.")
+                model = self.env[field.comodel_name]
+            path_fields.append(field)
+        return path_fields
+
+    def _fetch_field_values(self, records, paths):
+        """Return ``{record id: {path: value}}`` for the dotted ``paths``.
+
+        Each level of the paths is read on the whole batch at once, so the
+        number of queries depends on the depth of the paths and not on the
+        number of fields or records.
+        """
+        tree = {}
+        for path in paths:
+            self._get_field_path_fields(path)
+            node = tree
+            for name in path.split("."):
+                node = node.setdefault(name, {})
+        self._prefetch_field_tree(records, tree)
+
+        values = {}
+        for record in records:
+            record_values = values[record.id] = {}
+            for path in paths:
+                value = record
+                for name in path.split("."):
+                    value = value[:1][name]
+                record_values[path] = value
+        return values
+
+    @api.model
+    def _prefetch_field_tree(self, records, tree):
+        for name, subtree in tree.items():
+            related = records.mapped(name)
+            if subtree and related:
+                self._prefetch_field_tree(related, subtree)
+
+    def _get_lang_format(self):
+        lang = self.env["res.lang"]._lang_get(self.env.lang or "en_US")
+        tz = pytz.timezone(self.env.context.get("tz") or self.env.user.tz or "UTC")
+        return formatters.LangFormat(lang.date_format, lang.time_format, lang.format, tz)
+
+    def _get_value_formatters(self, paths):
+        """Return ``({path: formatter}, currency paths)`` for the field ``paths``.
+
+        Selection labels, float digits and the language formats are read
+        here once. Monetary values also need the currency of their record,
+        whose path is returned so that it is fetched with the values.
+        """
+        lang = self._get_lang_format()
+        value_formatters = {}
+        currency_paths = []
+        for path in paths:
+            field = self._get_field_path_fields(path)[-1]
+            currency_path = None
+            if field.type == "monetary":
+                model_fields = self.env[field.model_name]._fields
+                currency_field = field.currency_field or ("currency_id" if "currency_id" in model_fields else None)
+                if currency_field:
+                    prefix = path.rpartition(".")[0]
+                    currency_path = f"{prefix}.{currency_field}" if prefix else currency_field
+                    currency_paths.append(currency_path)
+            value_formatters[path] = formatters.build_formatter(
+                field,
+                lang,
+                selection=field._description_selection(self.env) if field.type == "selection" else None,
+                digits=field.get_digits(self.env) if field.type == "float" else None,
+                currency_path=currency_path,
+            )
+        return value_formatters, currency_paths
+
+    def _get_render_values(self, records, plan):
+        """Return ``{record id: {field path: text}}``, ``None`` marking empty values."""
+        value_formatters, currency_paths = self._get_value_formatters(plan.field_paths)
+        paths = tuple(plan.field_paths) + tuple(path for path in currency_paths if path not in plan.field_paths)
+        values = self._fetch_field_values(records, paths)
+        for record_id, record_values in values.items():
+            texts = values[record_id] = {}
+            for path in plan.field_paths:
+                value = record_values[path]
+                if value is False or value is None or (isinstance(value, models.BaseModel) and not value):
+                    texts[path] = None
+                else:
+                    texts[path] = value_formatters[path](value, record_values)
+        return values
+
+    def _get_render_processes(self, batch_size):
+        processes = int(self.env["ir.config_parameter"].sudo().get_param(RENDER_PROCESSES_PARAM, 1))
+        if processes <= 0:
+            processes = pool.default_processes()
+        return processes if batch_size >= processes * 2 else 1
+
+    def _prepare_render(self, records, timer=timing.NULL_TIMER):
+        """Return the ``(template, plan, render records)`` of a batch.
+
+        The template, compiled layout plan and custom code are prepared once
+        and shared by every record of the batch.
+        """
+        self.ensure_one()
+        if not self.input_pdf_attachment_id:
+            raise UserError("Please select a PDF file before processing.")
 
+        with timer.stage("template"):
+            template = self._get_template()
+        with timer.stage("layout"):
+            plan = self._get_layout_plan()
+        with timer.stage("values"):
+            values = self._get_render_values(records, plan)
+        with timer.stage("code"):
+            code_items = self._get_code_items(records, plan)
+        render_records = [RenderRecord(values[record.id], code_items.get(record.id, ())) for record in records]
+        return template, plan, render_records
+
+    def _get_spool_threshold(self):
+        size_mb = self.env["ir.config_parameter"].sudo().get_param(SPOOL_THRESHOLD_PARAM, 16)
+        return int(float(size_mb) * 1024 * 1024)
+
+    def _render_file(self, records, output_type="pdf", prepared=None, timer=timing.NULL_TIMER):
+        """Render ``records`` and return ``(file, mimetype, file_name)``.
+
+        The output is written into a rewound temporary file that moves from
+        memory to disk above the spool threshold. The caller closes it.
+        """
+        template, plan, render_records = prepared or self._prepare_render(records, timer)
+        processes = self._get_render_processes(len(records))
         pdf_name = self.output_pdf_name or "test.pdf"
-        attachment = self.env["ir.attachment"].create({
-            "name": pdf_name,
-            "type": "binary",
-            "datas": base64.b64encode(pdf_data).decode("utf-8"),
-            "mimetype": "application/pdf",
-            "res_model": self._name,
-            "res_id": self.id,
-        })
+        output = render.spooled_file(self._get_spool_threshold())
+        try:
+            if output_type == "zip":
+                base_name = pdf_name[:-4] if pdf_name.lower().endswith(".pdf") else pdf_name
+                named_records = [
+                    (f"{base_name}_{record.id}.pdf", render_record)
+                    for record, render_record in zip(records, render_records)
+                ]
+                if processes > 1:
+                    with timer.stage("render"):
+                        pool.render_zip_parallel(template, plan, named_records, processes, output=output)
+                else:
+                    render.render_zip(template, plan, named_records, timer, output)
+                mimetype, file_name = "application/zip", f"{base_name}.zip"
+            else:
+                if processes > 1:
+                    with timer.stage("render"):
+                        pool.render_pdf_parallel(template, plan, render_records, processes, output=output)
+                else:
+                    render.render_pdf(template, plan, render_records, timer, output)
+                mimetype, file_name = "application/pdf", pdf_name
+        except Exception:
+            output.close()
+            raise
+        output.seek(0)
+        return output, mimetype, file_name
+
+    def _render(self, records, output_type="pdf", prepared=None, timer=timing.NULL_TIMER):
+        """Render ``records`` and return ``(data, mimetype, file_name)``."""
+        output, mimetype, file_name = self._render_file(records, output_type, prepared, timer)
+        with output:
+            return output.read(), mimetype, file_name
+
+    def _prepare_preview(self, page_number=1, record=None):
+        """Return the ``(template, plan, render record)`` previewed on page
+        ``page_number``.
+
+        With ``record`` the page shows its values, otherwise field items
+        show their field path between brackets.
+        """
+        self.ensure_one()
+        if not self.input_pdf_attachment_id:
+            raise UserError("Please select a PDF file before processing.")
+        template = self._get_template()
+        if not 1 <= page_number <= len(template.pages):
+            raise UserError(f"The input PDF has no page {page_number}.")
+        plan = self._get_layout_plan()
+        if record:
+            records = self._get_target_records(record)
+            values = self._get_render_values(records, plan)[records.id]
+            render_record = RenderRecord(values, self._get_code_items(records, plan).get(records.id, ()))
+        else:
+            render_record = RenderRecord({path: f"[{path}]" for path in plan.field_paths}, ())
+        return template, plan, render_record
+
+    def _render_preview(self, page_number, output_format, dpi, prepared):
+        """Render the page prepared by ``_prepare_preview`` for the designer
+        and return ``(data, mimetype)``."""
+        template, plan, render_record = prepared
+        if output_format == "pdf":
+            return preview.preview_pdf(template, plan, render_record, page_number), "application/pdf"
+        if not preview.png_available():
+            raise UserError("PNG previews require the PyMuPDF Python package, use the PDF preview instead.")
+        return preview.preview_png(template, plan, render_record, page_number, dpi), "image/png"
+
+    def _get_preview_etag(self, page_number, output_format, dpi, prepared):
+        """Hash of everything a preview depends on, like ``_get_output_cache_key``."""
+        template, plan, render_record = prepared
+        return hashlib.sha1(repr((
+            self.id,
+            plan.version,
+            template.checksum,
+            page_number,
+            output_format,
+            dpi,
+            sorted(render_record.values.items()),
+            render_record.items,
+        )).encode()).hexdigest()
+
+    def _get_output_cache_key(self, records, output_type, prepared):
+        """Hash of the form version, the template and the resolved values of
+        ``records``: identical keys always produce identical files.
+
+        Values are resolved with the language, timezone and access rights
+        of the printing user, so the key is also the ETag of the render route.
+        """
+        template, plan, render_records = prepared
+        digest = hashlib.sha1(repr((
+            self.id,
+            self.write_date,
+            plan.version,
+            template.checksum,
+            output_type,
+            self.output_pdf_name,
+            records.ids,
+        )).encode())
+        for render_record in render_records:
+            digest.update(repr((sorted(render_record.values.items()), render_record.items)).encode())
+        return digest.hexdigest()
+
+    def process_action(self, records, output_type=None):
+        """Render one record id, a list of ids or a recordset of ``model_id``."""
+        self.ensure_one()
+        records = self._get_target_records(records)
+        output_type = output_type or (self.batch_output if len(records) > 1 else "pdf")
+        if self.queue_threshold and len(records) > self.queue_threshold:
+            job = self.env["pre.printed.form.job"]._enqueue(self, records, output_type, self.queue_chunk_size)
+            return {
+                "type": "ir.actions.act_window",
+                "res_model": job._name,
+                "res_id": job.id,
+                "view_mode": "form",
+                "target": "current",
+            }
+        if not self.store_output:
+            ids = ",".join(str(record_id) for record_id in records.ids)
+            return {
+                "type": "ir.actions.act_url",
+                "url": f"/pre_printed_form/{self.id}/render?ids={ids}&output_type={output_type}&download=1",
+                "target": "self",
+            }
+
+        timer = timing.StageTimer()
+        rendered = []
+
+        def render_output():
+            rendered.append(True)
+            return self._render(records, output_type, prepared, timer)
+
+        with timing.profiled(self.profile_next_render) as profiler:
+            prepared = self._prepare_render(records, timer)
+            with timer.stage("store"):
+                attachment = self.env["pre.printed.form.output"]._get_or_render(
+                    self,
+                    records,
+                    output_type,
+                    self._get_output_cache_key(records, output_type, prepared),
+                    render_output,
+                )
+        self.env["pre.printed.form.render.log"]._log(
+            self, records, output_type, timer, attachment.file_size, not rendered, profiler
+        )
 
         return {
             "type": "ir.actions.act_url",
@@ -266,11 +699,9 @@ class PrePrintedForm(models.Model):
         IrActionsServer = self.env["ir.actions.server"]
         for rec in self:
             action_code = f"""action = None
-for record in records:
-    pre_printed_form_id = {rec.id}
-    pre_printed_form = env['pre.printed.form'].search([('id', '=', pre_printed_form_id)], limit=1)
-    action = pre_printed_form.process_action(record.id)
-    break"""
+if records:
+    pre_printed_form = env['pre.printed.form'].browse({rec.id})
+    action = pre_printed_form.process_action(records)"""
             temp = IrActionsServer.create({
                 "name": rec.name,
                 "state": "code",
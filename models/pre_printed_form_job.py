@@ -0,0 +1,327 @@
+import json
+import logging
+import time
+import zipfile
+from io import BytesIO
+
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+
+from ..tools import pdf
+from ..tools import render
+from ..tools import timing
+
+_logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+
+
+class PrePrintedFormJob(models.Model):
+    _name = "pre.printed.form.job"
+    _description = "Pre-Printed Form Print Job"
+    _order = "id desc"
+
+    name = fields.Char(string="Job", required=True, readonly=True)
+    form_id = fields.Many2one(
+        comodel_name="pre.printed.form",
+        string="Pre-Printed Form",
+        required=True,
+        ondelete="cascade",
+        readonly=True,
+    )
+    user_id = fields.Many2one(
+        comodel_name="res.users",
+        string="Requested By",
+        required=True,
+        default=lambda self: self.env.user,
+        readonly=True,
+    )
+    output_type = fields.Selection(
+        selection=[
+            ("pdf", "Single PDF"),
+            ("zip", "ZIP of PDFs"),
+        ],
+        string="Output",
+        required=True,
+        default="pdf",
+        readonly=True,
+    )
+    record_count = fields.Integer(string="Records", readonly=True)
+    lang = fields.Char(string="Language", readonly=True, help="Language the chunks are rendered in.")
+    tz = fields.Char(string="Timezone", readonly=True, help="Timezone the chunks are rendered in.")
+    state = fields.Selection(
+        selection=[
+            ("queued", "Queued"),
+            ("running", "Running"),
+            ("done", "Done"),
+            ("failed", "Failed"),
+        ],
+        string="Status",
+        required=True,
+        default="queued",
+        readonly=True,
+    )
+    chunk_ids = fields.One2many(
+        comodel_name="pre.printed.form.job.chunk",
+        inverse_name="job_id",
+        string="Chunks",
+        readonly=True,
+    )
+    chunk_count = fields.Integer(string="Chunks", compute="_compute_progress")
+    chunk_done_count = fields.Integer(string="Chunks Done", compute="_compute_progress")
+    progress = fields.Float(string="Progress", compute="_compute_progress")
+    duration = fields.Float(string="Render Time (s)", compute="_compute_progress")
+    attachment_id = fields.Many2one(
+        comodel_name="ir.attachment",
+        string="Result",
+        readonly=True,
+    )
+    date_done = fields.Datetime(string="Finished On", readonly=True)
+    error = fields.Text(string="Error", readonly=True)
+
+    @api.depends("chunk_ids.state", "chunk_ids.duration")
+    def _compute_progress(self):
+        for job in self:
+            chunks = job.chunk_ids
+            done = chunks.filtered(lambda chunk: chunk.state == "done")
+            job.chunk_count = len(chunks)
+            job.chunk_done_count = len(done)
+            job.progress = 100.0 * len(done) / len(chunks) if chunks else 0.0
+            job.duration = sum(chunks.mapped("duration"))
+
+    @api.model
+    def _enqueue(self, form, records, output_type, chunk_size):
+        """Create a job rendering ``records`` in chunks of ``chunk_size``.
+
+        The job is running from the start: workers only lock and write its
+        chunks, so they never wait on each other for the job row. The
+        language and timezone of the request are kept on the job, so the
+        chunks format values like a direct print by the same user.
+        """
+        chunk_size = max(chunk_size, 1)
+        record_ids = records.ids
+        job = self.create({
+            "name": f"{form.name} ({len(record_ids)} records)",
+            "form_id": form.id,
+            "output_type": output_type,
+            "record_count": len(record_ids),
+            "lang": self.env.lang or self.env.user.lang,
+            "tz": self.env.context.get("tz") or self.env.user.tz,
+            "state": "running",
+            "chunk_ids": [
+                (0, 0, {
+                    "sequence": index,
+                    "res_ids": json.dumps(record_ids[start:start + chunk_size]),
+                })
+                for index, start in enumerate(range(0, len(record_ids), chunk_size))
+            ],
+        })
+        self.env.ref(f"{self._module}.ir_cron_process_print_jobs")._trigger()
+        return job
+
+    def action_retry_failed(self):
+        chunks = self.chunk_ids.filtered(lambda chunk: chunk.state == "failed")
+        chunks.write({"state": "pending", "attempts": 0, "error": False})
+        self.filtered(lambda job: job.state == "failed").write({"state": "running", "error": False})
+        self.env.ref(f"{self._module}.ir_cron_process_print_jobs")._trigger()
+        return True
+
+    @api.model
+    def _cron_process_chunks(self, time_limit=240):
+        """Render pending chunks until none is left or ``time_limit`` is spent.
+
+        Chunks are taken with ``FOR UPDATE SKIP LOCKED`` and committed one by
+        one, so several workers running this method share the queue.
+        """
+        Chunk = self.env["pre.printed.form.job.chunk"]
+        deadline = time.monotonic() + time_limit
+        while True:
+            self._finalize_ready_jobs()
+            self.env.cr.commit()
+            if time.monotonic() >= deadline:
+                self.env.ref(f"{self._module}.ir_cron_process_print_jobs")._trigger()
+                break
+            chunk = Chunk._acquire_next()
+            if not chunk:
+                break
+            chunk._process()
+            self.env.cr.commit()
+
+    @api.model
+    def _finalize_ready_jobs(self):
+        self.env.cr.execute("""
+            SELECT job.id
+              FROM pre_printed_form_job job
+             WHERE job.state IN ('queued', 'running')
+               AND NOT EXISTS (
+                   SELECT 1
+                     FROM pre_printed_form_job_chunk chunk
+                    WHERE chunk.job_id = job.id
+                      AND chunk.state != 'done'
+               )
+               FOR UPDATE SKIP LOCKED
+        """)
+        jobs = self.browse([row[0] for row in self.env.cr.fetchall()])
+        for job in jobs:
+            try:
+                with self.env.cr.savepoint():
+                    job._finalize()
+            except Exception as e:
+                # a job that cannot be merged must not block the rest of the queue
+                _logger.exception("Print job %s: merge failed", job.id)
+                job.write({"state": "failed", "error": str(e)})
+
+    def _finalize(self):
+        self.ensure_one()
+        chunks = self.chunk_ids.sorted("sequence")
+        form = self.form_id
+        pdf_name = form.output_pdf_name or "test.pdf"
+        base_name = pdf_name[:-4] if pdf_name.lower().endswith(".pdf") else pdf_name
+        with render.spooled_file(form._get_spool_threshold()) as output:
+            if self.output_type == "zip":
+                self._merge_zip(self._read_chunk_files(chunks), output)
+                mimetype, file_name = "application/zip", f"{base_name}.zip"
+            else:
+                pdf.concat_pdfs(list(self._read_chunk_files(chunks)), output)
+                mimetype, file_name = "application/pdf", pdf_name
+            output.seek(0)
+            data = output.read()
+        attachment = self.env["ir.attachment"].create({
+            "name": file_name,
+            "type": "binary",
+            "raw": data,
+            "mimetype": mimetype,
+            "res_model": self._name,
+            "res_id": self.id,
+        })
+        chunks.attachment_id.unlink()
+        self.write({
+            "state": "done",
+            "attachment_id": attachment.id,
+            "date_done": fields.Datetime.now(),
+        })
+
+    @staticmethod
+    def _read_chunk_files(chunks):
+        """Yield the file of each chunk, reading one attachment at a time."""
+        for chunk in chunks:
+            attachment = chunk.attachment_id.with_prefetch()
+            yield attachment.raw
+            attachment.invalidate_recordset(["raw", "datas"])
+
+    @staticmethod
+    def _merge_zip(chunk_files, output):
+        with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+            for chunk_file in chunk_files:
+                with zipfile.ZipFile(BytesIO(chunk_file)) as chunk_archive:
+                    for name in chunk_archive.namelist():
+                        archive.writestr(name, chunk_archive.read(name))
+
+    def action_open_result(self):
+        self.ensure_one()
+        if not self.attachment_id:
+            raise UserError("The print job has not finished yet.")
+        return {
+            "type": "ir.actions.act_url",
+            "url": f"/web/content/{self.attachment_id.id}?download=true",
+            "target": "self",
+        }
+
+
+class PrePrintedFormJobChunk(models.Model):
+    _name = "pre.printed.form.job.chunk"
+    _description = "Pre-Printed Form Print Job Chunk"
+    _order = "job_id, sequence"
+
+    job_id = fields.Many2one(
+        comodel_name="pre.printed.form.job",
+        string="Job",
+        required=True,
+        ondelete="cascade",
+        index=True,
+    )
+    sequence = fields.Integer(string="Sequence", required=True)
+    res_ids = fields.Text(string="Record IDs", required=True)
+    record_count = fields.Integer(string="Records", compute="_compute_record_count")
+    state = fields.Selection(
+        selection=[
+            ("pending", "Pending"),
+            ("done", "Done"),
+            ("failed", "Failed"),
+        ],
+        string="Status",
+        required=True,
+        default="pending",
+        index=True,
+    )
+    attempts = fields.Integer(string="Attempts", default=0)
+    duration = fields.Float(string="Render Time (s)")
+    error = fields.Text(string="Error")
+    attachment_id = fields.Many2one(comodel_name="ir.attachment", string="Output")
+    date_done = fields.Datetime(string="Finished On")
+
+    @api.depends("res_ids")
+    def _compute_record_count(self):
+        for chunk in self:
+            chunk.record_count = len(json.loads(chunk.res_ids or "[]"))
+
+    @api.model
+    def _acquire_next(self):
+        self.env.cr.execute("""
+            SELECT chunk.id
+              FROM pre_printed_form_job_chunk chunk
+              JOIN pre_printed_form_job job ON job.id = chunk.job_id
+             WHERE chunk.state = 'pending'
+               AND job.state != 'failed'
+             ORDER BY chunk.job_id, chunk.sequence
+             LIMIT 1
+               FOR UPDATE OF chunk SKIP LOCKED
+        """)
+        row = self.env.cr.fetchone()
+        return self.browse(row[0]) if row else self.browse()
+
+    def _process(self):
+        self.ensure_one()
+        job = self.job_id
+        start = time.perf_counter()
+        try:
+            with self.env.cr.savepoint():
+                # the cron environment has neither the language nor the timezone of the requester
+                form = job.form_id.with_user(job.user_id).with_context(
+                    lang=job.lang or job.user_id.lang,
+                    tz=job.tz or job.user_id.tz,
+                )
+                records = form._get_target_records(json.loads(self.res_ids))
+                timer = timing.StageTimer()
+                data, mimetype, file_name = form._render(records, job.output_type, timer=timer)
+                with timer.stage("store"):
+                    attachment = self.env["ir.attachment"].create({
+                        "name": f"{self.sequence:05d}_{file_name}",
+                        "type": "binary",
+                        "raw": data,
+                        "mimetype": mimetype,
+                        "res_model": self._name,
+                        "res_id": self.id,
+                    })
+                form.env["pre.printed.form.render.log"]._log(
+                    form, records, job.output_type, timer, len(data), job=job
+                )
+                self.write({
+                    "state": "done",
+                    "attempts": self.attempts + 1,
+                    "duration": time.perf_counter() - start,
+                    "error": False,
+                    "attachment_id": attachment.id,
+                    "date_done": fields.Datetime.now(),
+                })
+        except Exception as e:
+            _logger.exception("Print job %s: chunk %s failed", job.id, self.sequence)
+            attempts = self.attempts + 1
+            self.write({
+                "state": "failed" if attempts >= MAX_ATTEMPTS else "pending",
+                "attempts": attempts,
+                "duration": time.perf_counter() - start,
+                "error": str(e),
+            })
+            if attempts >= MAX_ATTEMPTS:
+                job.state = "failed"
@@ -0,0 +1,190 @@
+import hashlib
+import logging
+import time
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+
+class PrePrintedFormOutput(models.Model):
+    _name = "pre.printed.form.output"
+    _description = "Pre-Printed Form Generated Output"
+    _order = "write_date desc"
+
+    form_id = fields.Many2one(
+        comodel_name="pre.printed.form",
+        string="Pre-Printed Form",
+        required=True,
+        ondelete="cascade",
+        index=True,
+    )
+    res_model = fields.Char(string="Model", required=True)
+    res_ids = fields.Text(string="Record IDs", required=True)
+    output_type = fields.Selection(
+        selection=[
+            ("pdf", "Single PDF"),
+            ("zip", "ZIP of PDFs"),
+        ],
+        string="Output",
+        required=True,
+    )
+    slot_key = fields.Char(string="Slot", required=True, index=True)
+    cache_key = fields.Char(string="Content Key", required=True)
+    attachment_id = fields.Many2one(
+        comodel_name="ir.attachment",
+        string="File",
+        required=True,
+        ondelete="cascade",
+    )
+    hit_count = fields.Integer(string="Hits", default=0)
+    miss_count = fields.Integer(string="Renders", default=0)
+    last_hit = fields.Datetime(string="Last Reused On")
+
+    _sql_constraints = [
+        ("slot_key_unique", "unique(slot_key)", "There is already an output for these records."),
+    ]
+
+    @api.model
+    def _get_slot_key(self, form, records, output_type):
+        return hashlib.sha1(repr((form.id, records._name, records.ids, output_type)).encode()).hexdigest()
+
+    @api.model
+    def _get_or_render(self, form, records, output_type, cache_key, render):
+        """Return the attachment of ``records`` printed with ``form``.
+
+        The stored file is returned as is when ``cache_key`` matches the one
+        it was rendered with. Otherwise ``render()`` is called and its result
+        replaces the stale file instead of adding a new attachment.
+        """
+        slot_key = self._get_slot_key(form, records, output_type)
+        output = self.search([("slot_key", "=", slot_key)], limit=1)
+        if output and output.cache_key == cache_key:
+            self.env.cr.execute(
+                "UPDATE pre_printed_form_output SET hit_count = hit_count + 1, last_hit = now() at time zone 'UTC' "
+                "WHERE id = %s",
+                (output.id,),
+            )
+            output.invalidate_recordset(["hit_count", "last_hit"])
+            return output.attachment_id
+
+        data, mimetype, file_name = render()
+        attachment_vals = {
+            "name": file_name,
+            "type": "binary",
+            "raw": data,
+            "mimetype": mimetype,
+            "res_model": form._name,
+            "res_id": form.id,
+        }
+        if output:
+            output.attachment_id.write(attachment_vals)
+            output.write({"cache_key": cache_key, "miss_count": output.miss_count + 1})
+            return output.attachment_id
+
+        attachment = self.env["ir.attachment"].create(attachment_vals)
+        self.create({
+            "form_id": form.id,
+            "res_model": records._name,
+            "res_ids": ",".join(str(record_id) for record_id in records.ids),
+            "output_type": output_type,
+            "slot_key": slot_key,
+            "cache_key": cache_key,
+            "attachment_id": attachment.id,
+            "miss_count": 1,
+        })
+        return attachment
+
+    @api.model
+    def _get_expired_attachment_ids(self, limit):
+        """Return up to ``limit`` attachments of outputs that are older than
+        the retention days of their form or beyond its retention count."""
+        self.env.cr.execute("""
+            WITH ranked AS (
+                SELECT output.attachment_id,
+                       output.form_id,
+                       greatest(output.write_date, output.last_hit) AS last_used,
+                       row_number() OVER (
+                           PARTITION BY output.form_id
+                           ORDER BY greatest(output.write_date, output.last_hit) DESC, output.id DESC
+                       ) AS position
+                  FROM pre_printed_form_output output
+            )
+            SELECT ranked.attachment_id
+              FROM ranked
+              JOIN pre_printed_form form ON form.id = ranked.form_id
+             WHERE ((form.output_retention_days > 0
+                     AND ranked.last_used < now() at time zone 'UTC' - make_interval(days => form.output_retention_days))
+                 OR (form.output_retention_count > 0 AND ranked.position > form.output_retention_count))
+               AND NOT EXISTS (
+                   SELECT 1
+                     FROM pre_printed_form template_form
+                    WHERE template_form.input_pdf_attachment_id = ranked.attachment_id
+               )
+             LIMIT %s
+        """, (limit,))
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _get_expired_job_ids(self, limit):
+        """Return up to ``limit`` finished print jobs older than the retention days of their form."""
+        self.env.cr.execute("""
+            SELECT job.id
+              FROM pre_printed_form_job job
+              JOIN pre_printed_form form ON form.id = job.form_id
+             WHERE job.state IN ('done', 'failed')
+               AND form.output_retention_days > 0
+               AND coalesce(job.date_done, job.write_date)
+                   < now() at time zone 'UTC' - make_interval(days => form.output_retention_days)
+             LIMIT %s
+        """, (limit,))
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _attachment_bytes(self, domain_sql, params):
+        self.env.cr.execute(f"SELECT count(*), coalesce(sum(file_size), 0) FROM ir_attachment WHERE {domain_sql}", params)
+        return self.env.cr.fetchone()
+
+    @api.model
+    def _cron_gc_outputs(self, batch_size=1000, time_limit=240):
+        """Delete expired outputs and finished print jobs in chunks of
+        ``batch_size``, committing after each chunk.
+
+        Returns the number of deleted outputs, jobs and attachments and the
+        bytes they used.
+        """
+        Attachment = self.env["ir.attachment"].sudo()
+        Job = self.env["pre.printed.form.job"].sudo()
+        deadline = time.monotonic() + time_limit
+        report = {"outputs": 0, "jobs": 0, "attachments": 0, "bytes": 0}
+        steps = [
+            ("outputs", self._get_expired_attachment_ids),
+            ("jobs", self._get_expired_job_ids),
+        ]
+        for kind, get_expired_ids in steps:
+            while True:
+                if time.monotonic() >= deadline:
+                    self.env.ref(f"{self._module}.ir_cron_gc_outputs")._trigger()
+                    _logger.info("Pre-printed form outputs sweep interrupted by time limit: %s", report)
+                    return report
+                ids = get_expired_ids(batch_size)
+                if not ids:
+                    break
+                if kind == "outputs":
+                    count, size = self._attachment_bytes("id IN %s", (tuple(ids),))
+                    # outputs are deleted with their attachment
+                    Attachment.browse(ids).unlink()
+                else:
+                    jobs = Job.browse(ids)
+                    count, size = self._attachment_bytes(
+                        "(res_model = %s AND res_id IN %s) OR (res_model = %s AND res_id IN %s)",
+                        (Job._name, tuple(ids), "pre.printed.form.job.chunk", tuple(jobs.chunk_ids.ids) or (0,)),
+                    )
+                    (jobs.attachment_id | jobs.chunk_ids.attachment_id).unlink()
+                    jobs.unlink()
+                report[kind] += len(ids)
+                report["attachments"] += count
+                report["bytes"] += size
+                self.env.cr.commit()
+        _logger.info("Pre-printed form outputs sweep done: %s", report)
+        return report
@@ -0,0 +1,141 @@
+from datetime import timedelta
+
+from odoo import api, fields, models, tools
+
+from ..tools import timing
+
+RENDER_LOG_DAYS_PARAM = "pre_printed_forms.render_log_days"
+
+STAGES = ("template", "layout", "values", "code", "fonts", "draw", "merge", "render", "write", "store")
+
+
+class PrePrintedFormRenderLog(models.Model):
+    _name = "pre.printed.form.render.log"
+    _description = "Pre-Printed Form Render Log"
+    _order = "create_date desc"
+
+    form_id = fields.Many2one(
+        comodel_name="pre.printed.form",
+        string="Pre-Printed Form",
+        required=True,
+        ondelete="cascade",
+        index=True,
+    )
+    user_id = fields.Many2one(comodel_name="res.users", string="Printed By")
+    job_id = fields.Many2one(
+        comodel_name="pre.printed.form.job",
+        string="Print Job",
+        ondelete="set null",
+        help="Background print job this chunk render belongs to.",
+    )
+    output_type = fields.Selection(
+        selection=[
+            ("pdf", "Single PDF"),
+            ("zip", "ZIP of PDFs"),
+        ],
+        string="Output",
+    )
+    record_count = fields.Integer(string="Records")
+    cache_hit = fields.Boolean(string="Cache Hit", help="The stored output was reused without rendering.")
+    duration = fields.Float(string="Total (s)", digits=(16, 4))
+    output_size = fields.Integer(string="Size (bytes)")
+    template_time = fields.Float(string="Template (s)", digits=(16, 4), help="Template decode and parse.")
+    layout_time = fields.Float(string="Layout (s)", digits=(16, 4), help="Layout plan compilation.")
+    values_time = fields.Float(string="Values (s)", digits=(16, 4), help="Field values read from the records.")
+    code_time = fields.Float(string="Custom Code (s)", digits=(16, 4))
+    fonts_time = fields.Float(string="Fonts (s)", digits=(16, 4), help="Font registration.")
+    draw_time = fields.Float(string="Draw (s)", digits=(16, 4), help="Overlay canvas drawing.")
+    merge_time = fields.Float(string="Merge (s)", digits=(16, 4), help="Overlay merge into the template pages.")
+    render_time = fields.Float(string="Parallel Render (s)", digits=(16, 4), help="Rendering in the process pool.")
+    write_time = fields.Float(string="Write (s)", digits=(16, 4), help="Serialization of the output file.")
+    store_time = fields.Float(string="Store (s)", digits=(16, 4), help="Output cache lookup and attachment write.")
+    profile_attachment_id = fields.Many2one(
+        comodel_name="ir.attachment",
+        string="Profile",
+        ondelete="set null",
+        help="cProfile dump of the print, readable with pstats or snakeviz.",
+    )
+
+    @api.model
+    def _log(self, form, records, output_type, timer, output_size, cache_hit=False, profiler=None, job=None):
+        """Record the stage timings of one print of ``records`` with ``form``,
+        or of one chunk of the background print ``job``."""
+        vals = {
+            "form_id": form.id,
+            "user_id": self.env.uid,
+            "job_id": job.id if job else False,
+            "output_type": output_type,
+            "record_count": len(records),
+            "cache_hit": cache_hit,
+            "duration": timer.total(),
+            "output_size": output_size,
+        }
+        for stage in STAGES:
+            vals[f"{stage}_time"] = timer.timings.get(stage, 0.0)
+        log = self.sudo().create(vals)
+        if profiler is not None:
+            log.profile_attachment_id = self.env["ir.attachment"].sudo().create({
+                "name": f"{form.name}_profile_{log.id}.prof",
+                "type": "binary",
+                "raw": timing.profile_dump(profiler),
+                "mimetype": "application/octet-stream",
+                "res_model": log._name,
+                "res_id": log.id,
+            })
+            form.sudo().profile_next_render = False
+        return log
+
+    @api.autovacuum
+    def _gc_render_logs(self):
+        days = int(self.env["ir.config_parameter"].sudo().get_param(RENDER_LOG_DAYS_PARAM, 30))
+        logs = self.sudo().search([("create_date", "<", fields.Datetime.now() - timedelta(days=days))])
+        logs.profile_attachment_id.unlink()
+        logs.unlink()
+
+
+class PrePrintedFormRenderStats(models.Model):
+    _name = "pre.printed.form.render.stats"
+    _description = "Pre-Printed Form Render Statistics"
+    _auto = False
+    _order = "total_duration desc"
+
+    form_id = fields.Many2one(comodel_name="pre.printed.form", string="Pre-Printed Form", readonly=True)
+    render_count = fields.Integer(string="Prints", readonly=True)
+    cache_hit_count = fields.Integer(string="Cache Hits", readonly=True)
+    record_count = fields.Integer(string="Records", readonly=True)
+    total_duration = fields.Float(string="Total Time (s)", digits=(16, 3), readonly=True)
+    p50_duration = fields.Float(string="p50 (s)", digits=(16, 3), readonly=True, help="Of the prints that rendered.")
+    p95_duration = fields.Float(string="p95 (s)", digits=(16, 3), readonly=True, help="Of the prints that rendered.")
+    max_duration = fields.Float(string="Max (s)", digits=(16, 3), readonly=True, help="Of the prints that rendered.")
+    total_bytes = fields.Integer(string="Bytes", readonly=True)
+    template_time = fields.Float(string="Template (s)", digits=(16, 3), readonly=True)
+    layout_time = fields.Float(string="Layout (s)", digits=(16, 3), readonly=True)
+    values_time = fields.Float(string="Values (s)", digits=(16, 3), readonly=True)
+    code_time = fields.Float(string="Custom Code (s)", digits=(16, 3), readonly=True)
+    fonts_time = fields.Float(string="Fonts (s)", digits=(16, 3), readonly=True)
+    draw_time = fields.Float(string="Draw (s)", digits=(16, 3), readonly=True)
+    merge_time = fields.Float(string="Merge (s)", digits=(16, 3), readonly=True)
+    render_time = fields.Float(string="Parallel Render (s)", digits=(16, 3), readonly=True)
+    write_time = fields.Float(string="Write (s)", digits=(16, 3), readonly=True)
+    store_time = fields.Float(string="Store (s)", digits=(16, 3), readonly=True)
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        stage_sums = ",\n                   ".join(f"sum({stage}_time) AS {stage}_time" for stage in STAGES)
+        self.env.cr.execute(f"""
+            CREATE OR REPLACE VIEW {self._table} AS (
+            SELECT form_id AS id,
+                   form_id,
+                   count(*) AS render_count,
+                   count(*) FILTER (WHERE cache_hit) AS cache_hit_count,
+                   sum(record_count) AS record_count,
+                   sum(duration) AS total_duration,
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY duration) FILTER (WHERE NOT cache_hit) AS p50_duration,
+                   percentile_cont(0.95) WITHIN GROUP (ORDER BY duration) FILTER (WHERE NOT cache_hit) AS p95_duration,
+                   max(duration) FILTER (WHERE NOT cache_hit) AS max_duration,
+                   sum(output_size) AS total_bytes,
+                   {stage_sums}
+              FROM pre_printed_form_render_log
+             GROUP BY form_id
+            )
+        """)
@@ -0,0 +1,194 @@
+"""Tests of the ORM-free PDF object copier (``tools.pdf``).
+
+Run from the module directory, no Odoo server needed::
+
+    python -m pytest tests
+    python -m unittest discover -s tests
+"""
+import unittest
+import zlib
+from io import BytesIO
+
+import PyPDF2
+from PyPDF2.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    EncodedStreamObject,
+    FloatObject,
+    NameObject,
+    TextStringObject,
+)
+from reportlab.pdfgen import canvas
+
+from tools import pdf
+from tools import render
+from tools.layout import LayoutPlan, PlanItem, RenderRecord, TextStyle
+
+PAGE_SIZE = (200, 200)
+
+
+def _stream(data, compressed=False):
+    if compressed:
+        stream = EncodedStreamObject()
+        stream._data = zlib.compress(data)
+        stream[NameObject("/Filter")] = NameObject("/FlateDecode")
+    else:
+        stream = DecodedStreamObject()
+        stream.setData(data)
+    return stream
+
+
+def build_template(contents, annotations=()):
+    """Return a one page PDF whose ``/Contents`` is ``contents``: None, one
+    stream or a list of streams."""
+    writer = PyPDF2.PdfFileWriter()
+    page = writer.addBlankPage(*PAGE_SIZE)
+    if contents is not None:
+        if isinstance(contents, list):
+            page[NameObject("/Contents")] = ArrayObject(writer._addObject(stream) for stream in contents)
+        else:
+            page[NameObject("/Contents")] = writer._addObject(contents)
+    if annotations:
+        page_ref = writer.getReference(page)
+        refs = ArrayObject()
+        for annotation in annotations:
+            annotation[NameObject("/P")] = page_ref
+            refs.append(writer._addObject(annotation))
+        page[NameObject("/Annots")] = refs
+    output = BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def link_annotation(uri):
+    return DictionaryObject({
+        NameObject("/Type"): NameObject("/Annot"),
+        NameObject("/Subtype"): NameObject("/Link"),
+        NameObject("/Rect"): ArrayObject(FloatObject(value) for value in (10, 10, 50, 30)),
+        NameObject("/A"): DictionaryObject({
+            NameObject("/S"): NameObject("/URI"),
+            NameObject("/URI"): TextStringObject(uri),
+        }),
+    })
+
+
+def drawn_content(obj):
+    """Return the content drawn by a page or form XObject, including the
+    form XObjects it draws."""
+    if obj.get("/Type") == "/Page":
+        contents = obj["/Contents"].getObject() if "/Contents" in obj else ArrayObject()
+        streams = contents if isinstance(contents, ArrayObject) else [contents]
+    else:
+        streams = [obj]
+    data = b"\n".join(stream.getObject().getData() for stream in streams)
+    resources = obj["/Resources"].getObject() if "/Resources" in obj else {}
+    xobjects = resources["/XObject"].getObject() if "/XObject" in resources else {}
+    for xobject in xobjects.values():
+        xobject = xobject.getObject()
+        if xobject.get("/Subtype") == "/Form":
+            data += b"\n" + drawn_content(xobject)
+    return data
+
+
+def build_plan(share_template):
+    item = PlanItem(0, 20, 100, TextStyle("Helvetica", 10, False), "overlay", False)
+    return LayoutPlan(
+        version=1,
+        page_size=PAGE_SIZE,
+        styles={},
+        style_names={},
+        items=(item,),
+        field_paths=(),
+        font_names=frozenset({"Helvetica"}),
+        share_template=share_template,
+    )
+
+
+class TestPageToXObject(unittest.TestCase):
+
+    def xobject_data(self, template_data):
+        page = PyPDF2.PdfFileReader(BytesIO(template_data)).getPage(0)
+        writer = PyPDF2.PdfFileWriter()
+        return writer.getObject(pdf.page_to_xobject(writer, page, {})).getData()
+
+    def test_contents_array(self):
+        data = build_template([_stream(b"0 0 m 10 10 l S"), _stream(b"20 20 m 30 30 l S", compressed=True)])
+        self.assertEqual(self.xobject_data(data), b"0 0 m 10 10 l S\n20 20 m 30 30 l S")
+
+    def test_single_encoded_stream(self):
+        data = build_template(_stream(b"0 0 m 10 10 l S", compressed=True))
+        page = PyPDF2.PdfFileReader(BytesIO(data)).getPage(0)
+        writer = PyPDF2.PdfFileWriter()
+        xobject = writer.getObject(pdf.page_to_xobject(writer, page, {}))
+        # the encoded data is copied as is, without decoding it
+        self.assertIsInstance(xobject, EncodedStreamObject)
+        self.assertEqual(xobject["/Filter"], "/FlateDecode")
+        self.assertEqual(xobject.getData(), b"0 0 m 10 10 l S")
+
+    def test_single_decoded_stream(self):
+        self.assertEqual(self.xobject_data(build_template(_stream(b"0 0 m 10 10 l S"))), b"0 0 m 10 10 l S")
+
+    def test_missing_contents(self):
+        self.assertEqual(self.xobject_data(build_template(None)), b"")
+
+
+class TestRenderContents(unittest.TestCase):
+
+    def render(self, template_data, share_template):
+        template = render.load_template(template_data)
+        records = [RenderRecord({}, ()), RenderRecord({}, ())]
+        return PyPDF2.PdfFileReader(BytesIO(render.render_pdf(template, build_plan(share_template), records)))
+
+    def test_contents_array_both_paths(self):
+        data = build_template([_stream(b"0 0 m 10 10 l S"), _stream(b"20 20 m 30 30 l S")])
+        for share_template in (False, True):
+            with self.subTest(share_template=share_template):
+                output = self.render(data, share_template)
+                self.assertEqual(output.getNumPages(), 2)
+                content = drawn_content(output.getPage(1))
+                self.assertIn(b"0 0 m 10 10 l S", content)
+                self.assertIn(b"20 20 m 30 30 l S", content)
+                self.assertIn(b"(overlay) Tj", content)
+
+    def test_missing_contents_both_paths(self):
+        for share_template in (False, True):
+            with self.subTest(share_template=share_template):
+                self.assertEqual(self.render(build_template(None), share_template).getNumPages(), 2)
+
+
+class TestAnnotations(unittest.TestCase):
+
+    def test_annotations_are_kept_without_page_reference(self):
+        data = build_template(_stream(b"0 0 m 10 10 l S"), [link_annotation("https://example.com")])
+        template = render.load_template(data)
+        for share_template in (False, True):
+            with self.subTest(share_template=share_template):
+                output_data = render.render_pdf(template, build_plan(share_template), [RenderRecord({}, ())])
+                page = PyPDF2.PdfFileReader(BytesIO(output_data)).getPage(0)
+                annotations = [annotation.getObject() for annotation in page["/Annots"]]
+                self.assertEqual(len(annotations), 1)
+                self.assertEqual(annotations[0]["/A"]["/URI"], "https://example.com")
+                self.assertNotIn("/P", annotations[0])
+
+    def test_page_destinations_are_dropped(self):
+        reportlab_buffer = BytesIO()
+        template_pdf = canvas.Canvas(reportlab_buffer, pagesize=PAGE_SIZE)
+        template_pdf.bookmarkPage("first")
+        template_pdf.linkAbsolute("first", "first", (10, 10, 50, 30))
+        template_pdf.showPage()
+        template_pdf.save()
+        source = PyPDF2.PdfFileReader(BytesIO(reportlab_buffer.getvalue()))
+        writer = PyPDF2.PdfFileWriter()
+        copy = pdf.import_page(writer, source.getPage(0), {})
+        annotation = copy["/Annots"][0].getObject()
+        self.assertNotIn("/Dest", annotation)
+        # only the copied page itself may be a page of the output
+        self.assertFalse([
+            obj for obj in writer._objects
+            if isinstance(obj, DictionaryObject) and obj.get("/Type") == "/Page"
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,10 @@
+from . import fonts
+from . import formatters
+from . import layout
+from . import pdf
+from . import textbox
+from . import template_cache
+from . import timing
+from . import render
+from . import pool
+from . import preview
@@ -0,0 +1,183 @@
+import logging
+import os
+import threading
+import time
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+_logger = logging.getLogger(__name__)
+
+FONT_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static", "fonts")
+
+FALLBACK_FONT = "Times-Roman"
+
+TTF_FACES = {
+    # AgencyFB font variants
+    "AGENCYFB": "AGENCYFB.ttf",
+    "AGENCYFB-Bold": "AGENCYFB-Bold.ttf",
+    "AGENCYFB-Italic": "AGENCYFB-Italic.ttf",
+    "AGENCYFB-BoldItalic": "AGENCYFB-BoldItalic.ttf",
+    # Calibri font variants
+    "Calibri": "CALIBRI.ttf",
+    "Calibri-Bold": "CALIBRI-Bold.ttf",
+    "Calibri-Italic": "CALIBRI-Italic.ttf",
+    "Calibri-BoldItalic": "CALIBRI-BoldItalic.ttf",
+    # Arial font variants
+    "Arial": "ARIAL.ttf",
+    "Arial-Bold": "ARIAL-Bold.ttf",
+    "Arial-Italic": "ARIAL-Italic.ttf",
+    "Arial-BoldItalic": "ARIAL-BoldItalic.ttf",
+}
+
+STYLE_MAP = {
+    "times": {
+        "normal": "Times-Roman",
+        "bold": "Times-Bold",
+        "italic": "Times-Italic",
+        "bold_italic": "Times-BoldItalic",
+    },
+    "helvetica": {
+        "normal": "Helvetica",
+        "bold": "Helvetica-Bold",
+        "italic": "Helvetica-Oblique",
+        "bold_italic": "Helvetica-BoldOblique",
+    },
+    "arial": {
+        "normal": "Arial",
+        "bold": "Arial-Bold",
+        "italic": "Arial-Italic",
+        "bold_italic": "Arial-BoldItalic",
+    },
+    "calibri": {
+        "normal": "Calibri",
+        "bold": "Calibri-Bold",
+        "italic": "Calibri-Italic",
+        "bold_italic": "Calibri-BoldItalic",
+    },
+    "agency": {
+        "normal": "AGENCYFB",
+        "bold": "AGENCYFB-Bold",
+        "italic": "AGENCYFB-Italic",
+        "bold_italic": "AGENCYFB-BoldItalic",
+    },
+    "courier": {
+        "normal": "Courier",
+        "bold": "Courier-Bold",
+        "italic": "Courier-Oblique",
+        "bold_italic": "Courier-BoldOblique",
+    },
+}
+
+
+def resolve_font_name(font_style, bold=False, italic=False):
+    if bold and italic:
+        font_format_key = "bold_italic"
+    elif bold:
+        font_format_key = "bold"
+    elif italic:
+        font_format_key = "italic"
+    else:
+        font_format_key = "normal"
+    return STYLE_MAP.get(font_style or "times", STYLE_MAP["times"]).get(font_format_key, FALLBACK_FONT)
+
+
+class GlyphWidths(object):
+    """Glyph width table of one registered face.
+
+    Widths are stored in thousandths of the font size. Glyph advances
+    scale linearly with the size, so one table serves every size of the
+    face. Latin-1 is measured up front and other characters on first use,
+    so measuring a string never calls the font measurement APIs again.
+    """
+
+    def __init__(self, font_name):
+        self.font_name = font_name
+        self._widths = {char: pdfmetrics.stringWidth(char, font_name, 1000) for char in map(chr, range(32, 256))}
+
+    def width(self, char):
+        """Width of ``char`` at size 1000."""
+        width = self._widths.get(char)
+        if width is None:
+            width = self._widths[char] = pdfmetrics.stringWidth(char, self.font_name, 1000)
+        return width
+
+    def measure(self, text, font_size=1000):
+        widths = self._widths
+        total = 0.0
+        for char in text:
+            width = widths.get(char)
+            total += width if width is not None else self.width(char)
+        return total * font_size / 1000.0
+
+
+class FontRegistry(object):
+    """Process-wide registry of the TrueType faces shipped with the module.
+
+    Faces are parsed and registered with reportlab the first time a form
+    asks for them and stay registered for the lifetime of the worker.
+    """
+
+    def __init__(self, font_folder=FONT_FOLDER, faces=None):
+        self.font_folder = font_folder
+        self.faces = dict(TTF_FACES if faces is None else faces)
+        self._lock = threading.Lock()
+        self._loaded = {}
+        self._failed = {}
+        self._glyph_widths = {}
+
+    def ensure(self, font_name, fallback=FALLBACK_FONT):
+        """Return a registered font name usable with ``setFont``.
+
+        Standard PDF fonts are returned as is, shipped TrueType faces are
+        registered on first use and anything that cannot be loaded falls back
+        to ``fallback``.
+        """
+        if font_name in self._loaded or font_name in pdfmetrics.standardFonts:
+            return font_name
+        if font_name not in self.faces or font_name in self._failed:
+            return fallback
+        with self._lock:
+            if font_name not in self._loaded and font_name not in self._failed:
+                self._load(font_name)
+        return font_name if font_name in self._loaded else fallback
+
+    def glyph_widths(self, font_name):
+        """Return the ``GlyphWidths`` of the registered font ``font_name``."""
+        table = self._glyph_widths.get(font_name)
+        if table is None:
+            with self._lock:
+                table = self._glyph_widths.get(font_name)
+                if table is None:
+                    table = self._glyph_widths[font_name] = GlyphWidths(font_name)
+        return table
+
+    def warm(self, font_names=None):
+        """Register ``font_names`` (all shipped faces by default) up front."""
+        return [self.ensure(name) for name in (font_names or self.faces)]
+
+    def stats(self):
+        return {
+            "pid": os.getpid(),
+            "registered": {name: dict(info) for name, info in self._loaded.items()},
+            "glyph_tables": sorted(self._glyph_widths),
+            "failed": dict(self._failed),
+        }
+
+    def _load(self, font_name):
+        path = os.path.join(self.font_folder, self.faces[font_name])
+        start = time.perf_counter()
+        try:
+            pdfmetrics.registerFont(TTFont(font_name, path))
+        except Exception as e:
+            self._failed[font_name] = str(e)
+            _logger.warning("Failed to register font %s from %s: %s", font_name, path, e)
+            return
+        self._loaded[font_name] = {
+            "file": path,
+            "load_time": time.perf_counter() - start,
+            "loaded_at": time.time(),
+        }
+
+
+font_registry = FontRegistry()
@@ -0,0 +1,79 @@
+"""Formatting of field values for printing.
+
+``build_formatter`` returns a function turning a raw field value into the
+printed text. Everything that depends on the field or the language (labels,
+digits, date formats) is resolved when the formatter is built, once per
+batch, so formatting a value does not read any metadata.
+"""
+from collections import namedtuple
+from datetime import timezone
+
+# Language settings of a batch. ``format_number`` is ``res.lang.format`` of
+# the language and ``tz`` the timezone of the printing user.
+LangFormat = namedtuple("LangFormat", ["date_format", "time_format", "format_number", "tz"])
+
+
+def _display_names(value):
+    return ", ".join(name or "" for name in value.mapped("display_name"))
+
+
+def build_formatter(field, lang, selection=None, digits=None, currency_path=None):
+    """Return ``format(value, record_values)`` for the values of ``field``.
+
+    ``selection`` maps selection values to their labels, ``digits`` is the
+    precision of float fields and ``currency_path`` the path of the
+    currency of monetary fields in ``record_values``.
+    """
+    field_type = field.type
+
+    if field_type == "selection":
+        labels = dict(selection or ())
+        return lambda value, record_values: labels.get(value, str(value))
+
+    if field_type == "many2one":
+        return lambda value, record_values: value.display_name or ""
+
+    if field_type in ("one2many", "many2many"):
+        return lambda value, record_values: _display_names(value)
+
+    if field_type == "date":
+        date_format = lang.date_format
+        return lambda value, record_values: value.strftime(date_format)
+
+    if field_type == "datetime":
+        datetime_format = f"{lang.date_format} {lang.time_format}"
+        tz = lang.tz
+
+        def format_datetime(value, record_values):
+            return value.replace(tzinfo=timezone.utc).astimezone(tz).strftime(datetime_format)
+        return format_datetime
+
+    if field_type == "integer":
+        format_number = lang.format_number
+        return lambda value, record_values: format_number("%d", value, grouping=True)
+
+    if field_type == "float":
+        number_format = f"%.{digits[1] if digits else 2}f"
+        format_number = lang.format_number
+        return lambda value, record_values: format_number(number_format, value, grouping=True)
+
+    if field_type == "monetary":
+        format_number = lang.format_number
+        currency_formats = {}
+
+        def format_monetary(value, record_values):
+            currency = record_values.get(currency_path) if currency_path else None
+            if not currency:
+                return format_number("%.2f", value, grouping=True, monetary=True)
+            if currency.id not in currency_formats:
+                currency_formats[currency.id] = (
+                    f"%.{currency.decimal_places}f",
+                    currency.symbol or "",
+                    currency.position,
+                )
+            number_format, symbol, position = currency_formats[currency.id]
+            amount = format_number(number_format, value, grouping=True, monetary=True)
+            return f"{symbol} {amount}" if position == "before" else f"{amount} {symbol}"
+        return format_monetary
+
+    return lambda value, record_values: str(value)
@@ -0,0 +1,64 @@
+import threading
+from collections import namedtuple
+
+# ``wrap``, ``align``, ``shrink`` and ``min_font_size`` only apply to items
+# with a box (see ``tools.textbox``).
+TextStyle = namedtuple(
+    "TextStyle",
+    ["font_name", "font_size", "underline", "wrap", "align", "shrink", "min_font_size"],
+    defaults=(False, "left", False, 6),
+)
+
+# ``width`` and ``height`` are the optional box of the item, 0 for none.
+PlanItem = namedtuple(
+    "PlanItem",
+    ["page", "x", "y", "style", "text", "field_path", "width", "height"],
+    defaults=(0.0, 0.0),
+)
+
+LayoutPlan = namedtuple(
+    "LayoutPlan",
+    ["version", "page_size", "styles", "style_names", "items", "field_paths", "font_names", "share_template"],
+)
+
+# Data of one printed record: its ``{field path: text}`` values (``None``
+# for empty values) and the extra items returned by the form's custom code.
+RenderRecord = namedtuple("RenderRecord", ["values", "items"])
+
+DEFAULT_STYLE = TextStyle("Times-Roman", 12, False)
+
+
+class LayoutCache(object):
+    """Per-process cache of compiled layout plans.
+
+    Plans are stored under a ``(database, form id)`` key and are only
+    returned while their version matches the version of the form, which is
+    bumped in the database whenever the layout changes.
+    """
+
+    def __init__(self):
+        self._plans = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        plan = self._plans.get(key)
+        if plan is not None and plan.version == version:
+            return plan
+        return None
+
+    def put(self, key, plan):
+        with self._lock:
+            current = self._plans.get(key)
+            if current is None or current.version <= plan.version:
+                self._plans[key] = plan
+
+    def discard(self, key):
+        with self._lock:
+            self._plans.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+
+
+layout_cache = LayoutCache()
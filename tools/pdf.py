@@ -0,0 +1,273 @@
+import hashlib
+from io import BytesIO
+
+import PyPDF2
+from PyPDF2.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    EncodedStreamObject,
+    IndirectObject,
+    NameObject,
+    NumberObject,
+    StreamObject,
+)
+from PyPDF2.pdf import PageObject
+
+PAGE_KEYS = (
+    "/MediaBox",
+    "/CropBox",
+    "/BleedBox",
+    "/TrimBox",
+    "/ArtBox",
+    "/Rotate",
+    "/UserUnit",
+    "/Group",
+    "/Resources",
+    "/Contents",
+)
+
+# back-references of annotations to their page and form field, copying them
+# would pull the whole source page tree into the output
+ANNOTATION_SKIP_KEYS = ("/P", "/Parent")
+
+_PENDING = object()
+
+
+def import_object(writer, obj, memo):
+    """Copy ``obj`` and everything it references into ``writer``.
+
+    PyPDF2 rewrites the objects of a reader in place when they are written,
+    so pages of a shared reader are copied instead. ``memo`` maps source
+    references to their copies, an object referenced several times is
+    therefore only written once per output. Streams are also shared by
+    content, so identical images or fonts coming from different source
+    files are written once as well.
+    """
+    if isinstance(obj, IndirectObject):
+        key = (obj.pdf, obj.idnum, obj.generation)
+        ref = memo.get(key)
+        if ref is _PENDING:
+            # a stream referring to itself, it can not be shared by content
+            ref = memo[key] = writer._addObject(None)
+        elif ref is None:
+            target = obj.getObject()
+            if isinstance(target, StreamObject):
+                ref = _import_stream(writer, key, target, memo)
+            else:
+                ref = memo[key] = writer._addObject(None)
+                writer._objects[ref.idnum - 1] = import_object(writer, target, memo)
+        return ref
+    if isinstance(obj, StreamObject):
+        copy = EncodedStreamObject() if isinstance(obj, EncodedStreamObject) else DecodedStreamObject()
+        copy._data = obj._data
+    elif isinstance(obj, DictionaryObject):
+        copy = DictionaryObject()
+    elif isinstance(obj, ArrayObject):
+        return ArrayObject(import_object(writer, value, memo) for value in obj)
+    else:
+        return obj
+    for key, value in obj.items():
+        copy[key] = import_object(writer, value, memo)
+    return copy
+
+
+def _import_stream(writer, key, stream, memo):
+    memo[key] = _PENDING
+    copy = import_object(writer, stream, memo)
+    ref = memo[key]
+    if ref is not _PENDING:
+        writer._objects[ref.idnum - 1] = copy
+        return ref
+    digest = hashlib.sha1(copy._data)
+    digest.update(repr((type(copy).__name__, sorted(copy.items()))).encode())
+    content_key = ("content", digest.digest())
+    ref = memo.get(content_key)
+    if ref is None:
+        ref = memo[content_key] = writer._addObject(copy)
+    memo[key] = ref
+    return ref
+
+
+def _is_page_destination(destination):
+    destination = destination.getObject()
+    if isinstance(destination, DictionaryObject) and "/D" in destination:
+        destination = destination["/D"]
+    if not isinstance(destination, ArrayObject) or not destination:
+        return False
+    target = destination[0].getObject()
+    return isinstance(target, DictionaryObject) and target.get("/Type") == "/Page"
+
+
+def import_annotation(writer, annotation, memo):
+    """Copy ``annotation`` into ``writer`` without its page and form field
+    back-references.
+
+    Links to a page of the source file are dropped with their destination,
+    since that page is not part of the output. Appearance streams, URI
+    links and popups are kept.
+    """
+    if isinstance(annotation, IndirectObject):
+        key = ("annotation", annotation.pdf, annotation.idnum, annotation.generation)
+        ref = memo.get(key)
+        if ref is None:
+            ref = memo[key] = writer._addObject(None)
+            writer._objects[ref.idnum - 1] = import_annotation(writer, annotation.getObject(), memo)
+        return ref
+    copy = DictionaryObject()
+    for key, value in annotation.items():
+        if key in ANNOTATION_SKIP_KEYS:
+            continue
+        if key == "/Dest" or (key == "/A" and value.getObject().get("/S") == "/GoTo"):
+            if _is_page_destination(value):
+                continue
+        if key in ("/Popup", "/IRT"):
+            copy[key] = import_annotation(writer, value, memo)
+        else:
+            copy[key] = import_object(writer, value, memo)
+    return copy
+
+
+def _import_annotations(writer, page, copy, memo):
+    if "/Annots" in page:
+        annotations = page["/Annots"].getObject()
+        copy[NameObject("/Annots")] = ArrayObject(
+            import_annotation(writer, annotation, memo) for annotation in annotations
+        )
+
+
+def import_page(writer, page, memo):
+    """Return a copy of ``page`` owned by ``writer``, ready for ``addPage``."""
+    copy = PageObject(writer)
+    copy[NameObject("/Type")] = NameObject("/Page")
+    for key in PAGE_KEYS:
+        if key in page:
+            copy[NameObject(key)] = import_object(writer, page.raw_get(key), memo)
+    _import_annotations(writer, page, copy, memo)
+    return copy
+
+
+def _shared_stream(writer, memo, data):
+    key = ("stream", data)
+    ref = memo.get(key)
+    if ref is None:
+        stream = DecodedStreamObject()
+        stream.setData(data)
+        ref = memo[key] = writer._addObject(stream)
+    return ref
+
+
+def page_to_xobject(writer, page, memo):
+    """Add ``page`` to ``writer`` as a form XObject and return its reference.
+
+    The XObject can then be drawn on any number of pages of the output
+    without parsing or copying its content stream again.
+    """
+    contents = page["/Contents"] if "/Contents" in page else None
+    if isinstance(contents, EncodedStreamObject):
+        xobject = EncodedStreamObject()
+        xobject._data = contents._data
+        for key in ("/Filter", "/DecodeParms"):
+            if key in contents:
+                xobject[NameObject(key)] = import_object(writer, contents.raw_get(key), memo)
+    elif isinstance(contents, ArrayObject):
+        # the streams of a contents array form one content stream together
+        xobject = DecodedStreamObject()
+        xobject.setData(b"\n".join(stream.getObject().getData() for stream in contents))
+    else:
+        xobject = DecodedStreamObject()
+        xobject.setData(contents.getData() if contents is not None else b"")
+    xobject.update({
+        NameObject("/Type"): NameObject("/XObject"),
+        NameObject("/Subtype"): NameObject("/Form"),
+        NameObject("/FormType"): NumberObject(1),
+        NameObject("/BBox"): ArrayObject(page.mediaBox),
+    })
+    if "/Resources" in page:
+        xobject[NameObject("/Resources")] = import_object(writer, page.raw_get("/Resources"), memo)
+    return writer._addObject(xobject)
+
+
+def template_xobject(writer, page, memo):
+    """Return the form XObject of the template ``page`` in ``writer``, added on first use."""
+    key = ("template", id(page))
+    if key not in memo:
+        # the page is kept in the memo so that its id can not be reused
+        memo[key] = (page, page_to_xobject(writer, page, memo))
+    return memo[key][1]
+
+
+def compose_page(writer, page, xobject_refs, memo):
+    """Return a new page of ``writer`` with the boxes of ``page`` that only
+    draws the XObjects of ``xobject_refs`` one above the other.
+
+    With the template page itself as first XObject, every output page only
+    holds references: the template content is written once per output.
+    """
+    composed = PageObject(writer)
+    composed[NameObject("/Type")] = NameObject("/Page")
+    for key in PAGE_KEYS:
+        if key not in ("/Resources", "/Contents") and key in page:
+            composed[NameObject(key)] = import_object(writer, page.raw_get(key), memo)
+    # annotations stay on the page, they can not live in a form XObject
+    _import_annotations(writer, page, composed, memo)
+    xobjects = DictionaryObject()
+    operators = []
+    for index, ref in enumerate(xobject_refs):
+        name = NameObject("/PPFLayer%d" % index)
+        xobjects[name] = ref
+        operators.append("q %s Do Q" % name)
+    composed[NameObject("/Resources")] = DictionaryObject({NameObject("/XObject"): xobjects})
+    composed[NameObject("/Contents")] = _shared_stream(writer, memo, " ".join(operators).encode())
+    return composed
+
+
+def stamp_page(writer, page, xobject_refs, memo):
+    """Return a copy of ``page`` owned by ``writer`` with ``xobject_refs`` drawn on top."""
+    stamped = import_page(writer, page, memo)
+    if not xobject_refs:
+        return stamped
+
+    resources = DictionaryObject()
+    if "/Resources" in stamped:
+        resources.update(stamped["/Resources"].getObject())
+    xobjects = DictionaryObject()
+    if "/XObject" in resources:
+        xobjects.update(resources["/XObject"].getObject())
+    operators = []
+    for index, ref in enumerate(xobject_refs):
+        name = NameObject("/PPFOverlay%d" % index)
+        xobjects[name] = ref
+        operators.append("q %s Do Q" % name)
+    resources[NameObject("/XObject")] = xobjects
+    stamped[NameObject("/Resources")] = resources
+
+    contents = ArrayObject()
+    if "/Contents" in stamped:
+        original = stamped.raw_get("/Contents")
+        contents.append(_shared_stream(writer, memo, b"q\n"))
+        if isinstance(original.getObject(), ArrayObject):
+            contents.extend(original.getObject())
+        else:
+            contents.append(original)
+        contents.append(_shared_stream(writer, memo, b"\nQ\n"))
+    contents.append(_shared_stream(writer, memo, " ".join(operators).encode()))
+    stamped[NameObject("/Contents")] = contents
+    return stamped
+
+
+def concat_pdfs(parts, output=None):
+    """Concatenate the PDF files ``parts`` into one PDF file, written into
+    the file object ``output`` when given (and returned) or returned as bytes."""
+    output_pdf = PyPDF2.PdfFileWriter()
+    memo = {}
+    for part in parts:
+        part_pdf = PyPDF2.PdfFileReader(BytesIO(part))
+        for index in range(part_pdf.getNumPages()):
+            output_pdf.addPage(import_page(output_pdf, part_pdf.getPage(index), memo))
+    if output is not None:
+        output_pdf.write(output)
+        return output
+    output_stream = BytesIO()
+    output_pdf.write(output_stream)
+    return output_stream.getvalue()
@@ -0,0 +1,66 @@
+"""Process pool driver for the ORM-free rendering core.
+
+Workers are forked so they inherit the loaded module, the registered fonts
+and the parsed template. They only receive the compiled plan and the
+``RenderRecord`` of their chunk and send back PDF bytes, never touching the database.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from . import pdf
+from . import render
+from .template_cache import template_cache
+
+_worker_template = None
+
+
+def _init_worker(template_data, checksum):
+    global _worker_template
+    _worker_template = template_cache.get(checksum, lambda: template_data)
+
+
+def _render_pdf_chunk(plan, records):
+    return render.render_pdf(_worker_template, plan, records)
+
+
+def _render_documents_chunk(plan, named_records):
+    return list(render.render_documents(_worker_template, plan, named_records))
+
+
+def _split(sequence, processes, chunk_size=None):
+    if not chunk_size:
+        # a few chunks per process so a slow chunk does not hold up the pool
+        chunk_size = max(1, -(-len(sequence) // (processes * 4)))
+    return [sequence[start:start + chunk_size] for start in range(0, len(sequence), chunk_size)]
+
+
+def _executor(template, processes):
+    return ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_init_worker,
+        initargs=(template.data, template.checksum),
+    )
+
+
+def default_processes():
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+
+def render_pdf_parallel(template, plan, records, processes=None, chunk_size=None, output=None):
+    """Parallel version of ``render.render_pdf``."""
+    processes = processes or default_processes()
+    chunks = _split(list(records), processes, chunk_size)
+    with _executor(template, processes) as executor:
+        parts = list(executor.map(_render_pdf_chunk, [plan] * len(chunks), chunks))
+    return pdf.concat_pdfs(parts, output)
+
+
+def render_zip_parallel(template, plan, named_records, processes=None, chunk_size=None, output=None):
+    """Parallel version of ``render.render_zip``."""
+    processes = processes or default_processes()
+    chunks = _split(list(named_records), processes, chunk_size)
+    with _executor(template, processes) as executor:
+        parts = executor.map(_render_documents_chunk, [plan] * len(chunks), chunks)
+        return render.write_zip((document for part in parts for document in part), output)
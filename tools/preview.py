@@ -0,0 +1,120 @@
+"""Single page previews of a layout for the form designer.
+
+Only the overlay of the previewed page is drawn for every request. For PNG
+previews the template page is rasterised once per template, page and
+resolution and kept in ``background_cache``, so moving an item only costs
+drawing and rasterising the overlay. PNG previews need PyMuPDF.
+"""
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import PyPDF2
+from PIL import Image
+from reportlab.pdfgen import canvas
+
+from . import fonts
+from . import pdf
+from . import render
+
+try:
+    import pymupdf as fitz
+except ImportError:
+    try:
+        import fitz
+    except ImportError:
+        fitz = None
+
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+
+
+def png_available():
+    return fitz is not None
+
+
+class BackgroundCache(object):
+    """Per-process LRU cache of rasterised template pages, keyed by
+    ``(template checksum, page number, dpi)``."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._images = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                return image
+        image = loader()
+        size = image.width * image.height * len(image.getbands())
+        with self._lock:
+            if key not in self._images and size <= self.max_bytes:
+                self._images[key] = image
+                self._size += size
+                while self._size > self.max_bytes:
+                    _key, evicted = self._images.popitem(last=False)
+                    self._size -= evicted.width * evicted.height * len(evicted.getbands())
+        return image
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+            self._size = 0
+
+
+background_cache = BackgroundCache()
+
+
+def render_page_overlay(plan, record, page_number, compress=True):
+    """Return a one page PDF with the items of ``record`` printed on ``page_number``.
+
+    Overlays that are rasterised right away skip compression, which is a
+    large part of the drawing time with embedded TrueType fonts.
+    """
+    fonts.font_registry.warm(plan.font_names)
+    items = [item for item in plan.items + tuple(record.items) if item.page in (0, page_number)]
+    buffer = BytesIO()
+    overlay_pdf = canvas.Canvas(buffer, pagesize=plan.page_size, pageCompression=int(compress))
+    render.draw_items(overlay_pdf, items, record.values)
+    overlay_pdf.showPage()
+    overlay_pdf.save()
+    return buffer.getvalue()
+
+
+def preview_pdf(template, plan, record, page_number):
+    """Return the template page ``page_number`` (1-based) stamped with its overlay as a PDF."""
+    overlay = PyPDF2.PdfFileReader(BytesIO(render_page_overlay(plan, record, page_number)))
+    output_pdf = PyPDF2.PdfFileWriter()
+    memo = {}
+    with template.lock:
+        template_page = template.pages[page_number - 1]
+        xobject = pdf.page_to_xobject(output_pdf, overlay.getPage(0), memo)
+        output_pdf.addPage(pdf.stamp_page(output_pdf, template_page, [xobject], memo))
+    return render.write_pdf(output_pdf)
+
+
+def _rasterize(data, index, dpi, alpha=False):
+    with fitz.open(stream=data, filetype="pdf") as document:
+        pixmap = document[index].get_pixmap(dpi=dpi, alpha=alpha)
+        mode = "RGBA" if alpha else "RGB"
+        return Image.frombytes(mode, (pixmap.width, pixmap.height), pixmap.samples)
+
+
+def preview_png(template, plan, record, page_number, dpi=96):
+    """Return the template page ``page_number`` (1-based) with its overlay as a PNG image."""
+    if fitz is None:
+        raise RuntimeError("PNG previews require PyMuPDF (fitz).")
+    background = background_cache.get(
+        (template.checksum, page_number, dpi),
+        lambda: _rasterize(template.data, page_number - 1, dpi),
+    )
+    overlay = _rasterize(render_page_overlay(plan, record, page_number, compress=False), 0, dpi, alpha=True)
+    image = background.copy()
+    # PDF coordinates start at the bottom left corner: align the bottoms of both pages
+    image.paste(overlay, (0, image.height - overlay.height), overlay)
+    output = BytesIO()
+    image.save(output, format="PNG", compress_level=1)
+    return output.getvalue()
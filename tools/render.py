@@ -0,0 +1,214 @@
+"""ORM-free rendering core.
+
+Everything in this module works on plain data: template bytes or a cached
+``TemplateEntry``, a compiled ``LayoutPlan`` and one ``RenderRecord`` per
+printed record. It can therefore run outside of an Odoo worker, e.g. in a
+process pool.
+"""
+import hashlib
+import tempfile
+import zipfile
+from io import BytesIO
+
+import PyPDF2
+from reportlab import rl_config
+from reportlab.pdfgen import canvas
+
+from . import fonts
+from . import pdf
+from . import textbox
+from .layout import TextStyle
+from .timing import NULL_TIMER
+from .template_cache import template_cache
+
+
+def load_template(data, checksum=None):
+    """Return the cached ``TemplateEntry`` for the template ``data``."""
+    return template_cache.get(checksum or hashlib.sha1(data).hexdigest(), lambda: data)
+
+
+def render_overlay(plan, record):
+    """Draw the overlay of one record, one canvas page per template page key.
+
+    Returns the overlay PDF and the page key of each of its pages, key 0
+    holding the items printed on every template page. Items without a
+    style (custom code items) keep the font that is currently active.
+    """
+    overlay_pdf_stream, (page_keys,) = render_overlays(plan, [record])
+    return overlay_pdf_stream, page_keys
+
+
+def render_overlays(plan, records):
+    """Draw the overlays of all ``records`` on a single canvas.
+
+    Returns the overlay PDF and, for each record, the page keys of its
+    pages, which follow the pages of the previous records. Since there is
+    one canvas, every embedded TrueType face is subset once for the glyphs
+    of the whole batch instead of once per record.
+    """
+    buffer = BytesIO()
+    overlay_pdf = None
+    record_page_keys = []
+    for record in records:
+        pages = {}
+        for item in plan.items + tuple(record.items):
+            pages.setdefault(item.page, []).append(item)
+        page_keys = sorted(pages)
+        record_page_keys.append(page_keys)
+        if not page_keys:
+            continue
+        if overlay_pdf is None:
+            overlay_pdf = canvas.Canvas(buffer, pagesize=plan.page_size)
+        # every record starts with the default font of a new canvas
+        overlay_pdf.setFont(rl_config.canvas_basefontname, 12)
+        for page_key in page_keys:
+            draw_items(overlay_pdf, pages[page_key], record.values)
+            overlay_pdf.showPage()
+
+    if overlay_pdf is None:
+        return None, record_page_keys
+    overlay_pdf.save()
+    overlay_pdf_stream = buffer.getvalue()
+    buffer.close()
+    return overlay_pdf_stream, record_page_keys
+
+
+def draw_items(overlay_pdf, items, values):
+    """Draw ``items`` on the current page of the canvas ``overlay_pdf``.
+
+    Items with a box are laid out with ``textbox.layout_text``, which may
+    wrap, shrink or cut their text, the others are drawn on one line.
+    """
+    for item in items:
+        style = item.style
+        if style is not None:
+            overlay_pdf.setFont(style.font_name, style.font_size)
+
+        text_to_draw = item.text
+        value = values.get(item.field_path) if item.field_path else None
+        if value is not None and value is not False:
+            text_to_draw = value
+        # empty Odoo values are False: print nothing rather than "False"
+        text_to_draw = "" if text_to_draw is None or text_to_draw is False else str(text_to_draw)
+
+        if item.width or item.height:
+            font_name = style.font_name if style is not None else overlay_pdf._fontname
+            font_size, lines = textbox.layout_text(
+                text_to_draw, item.x, item.y, item.width, item.height,
+                style or TextStyle(font_name, overlay_pdf._fontsize, False),
+                fonts.font_registry.glyph_widths(font_name),
+            )
+        else:
+            font_size = overlay_pdf._fontsize
+            lines = [(item.x, item.y, text_to_draw, None)]
+
+        if font_size != overlay_pdf._fontsize:
+            overlay_pdf.setFont(overlay_pdf._fontname, font_size)
+        for x, y, line, line_width in lines:
+            overlay_pdf.drawString(x, y, line)
+            if style is not None and style.underline:
+                if line_width is None:
+                    line_width = fonts.font_registry.glyph_widths(style.font_name).measure(line, font_size)
+                overlay_pdf.line(x, y - 2, x + line_width, y - 2)
+        if style is not None and font_size != style.font_size:
+            # later items without a style keep the size of this one, not the shrunk size
+            overlay_pdf.setFont(style.font_name, style.font_size)
+
+
+def merge_overlay(output_pdf, template, overlay, memo, share_template=False):
+    """Append the template pages stamped with ``overlay`` to ``output_pdf``.
+
+    With ``share_template`` every template page is written once as a form
+    XObject and the pages of each record only refer to it and to their
+    overlay, so the output grows with the overlays and not the template.
+    """
+    overlay_pdf_stream, page_keys = overlay
+    overlay_pdf = PyPDF2.PdfFileReader(BytesIO(overlay_pdf_stream)) if overlay_pdf_stream else None
+    merge_overlay_pages(output_pdf, template, overlay_pdf, 0, page_keys, memo, share_template)
+
+
+def merge_overlay_pages(output_pdf, template, overlay_pdf, first_page, page_keys, memo, share_template=False):
+    """Same as ``merge_overlay`` for the overlay pages of one record in the
+    PdfFileReader ``overlay_pdf``, starting at page index ``first_page``."""
+    overlay_refs = {}
+    for index, page_key in enumerate(page_keys, first_page):
+        overlay_refs[page_key] = pdf.page_to_xobject(output_pdf, overlay_pdf.getPage(index), memo)
+    with template.lock:
+        for page_number, template_page in enumerate(template.pages, 1):
+            refs = [overlay_refs[key] for key in (0, page_number) if key in overlay_refs]
+            if share_template:
+                refs.insert(0, pdf.template_xobject(output_pdf, template_page, memo))
+                output_pdf.addPage(pdf.compose_page(output_pdf, template_page, refs, memo))
+            else:
+                output_pdf.addPage(pdf.stamp_page(output_pdf, template_page, refs, memo))
+
+
+def spooled_file(max_size):
+    """Return a temporary file kept in memory up to ``max_size`` bytes and moved to disk above."""
+    return tempfile.SpooledTemporaryFile(max_size=max_size)
+
+
+def write_pdf(output_pdf, output=None):
+    """Write ``output_pdf`` into the file object ``output`` and return it,
+    or return the PDF bytes when no ``output`` is given."""
+    if output is not None:
+        output_pdf.write(output)
+        return output
+    output_pdf_stream = BytesIO()
+    output_pdf.write(output_pdf_stream)
+    pdf_data = output_pdf_stream.getvalue()
+    output_pdf_stream.close()
+    return pdf_data
+
+
+def render_pdf(template, plan, records, timer=NULL_TIMER, output=None):
+    """Render every ``RenderRecord`` of ``records`` into one PDF.
+
+    ``timer`` is an optional ``StageTimer`` collecting the time spent in
+    the fonts, draw, merge and write stages. The PDF is written into the
+    file object ``output`` when given, see ``write_pdf``.
+    """
+    with timer.stage("fonts"):
+        fonts.font_registry.warm(plan.font_names)
+    output_pdf = PyPDF2.PdfFileWriter()
+    memo = {}
+    with timer.stage("draw"):
+        overlay_pdf_stream, record_page_keys = render_overlays(plan, records)
+    with timer.stage("merge"):
+        overlay_pdf = PyPDF2.PdfFileReader(BytesIO(overlay_pdf_stream)) if overlay_pdf_stream else None
+        first_page = 0
+        for page_keys in record_page_keys:
+            merge_overlay_pages(output_pdf, template, overlay_pdf, first_page, page_keys, memo, plan.share_template)
+            first_page += len(page_keys)
+    with timer.stage("write"):
+        return write_pdf(output_pdf, output)
+
+
+def render_documents(template, plan, named_records, timer=NULL_TIMER):
+    """Yield ``(name, pdf data)`` for every ``(name, RenderRecord)`` of ``named_records``."""
+    with timer.stage("fonts"):
+        fonts.font_registry.warm(plan.font_names)
+    for name, record in named_records:
+        output_pdf = PyPDF2.PdfFileWriter()
+        with timer.stage("draw"):
+            overlay = render_overlay(plan, record)
+        with timer.stage("merge"):
+            merge_overlay(output_pdf, template, overlay, {}, plan.share_template)
+        with timer.stage("write"):
+            data = write_pdf(output_pdf)
+        yield name, data
+
+
+def write_zip(documents, output=None):
+    """Store the ``(name, data)`` of ``documents`` in a ZIP archive, written
+    into the file object ``output`` when given (and returned) or returned as bytes."""
+    zip_stream = output if output is not None else BytesIO()
+    with zipfile.ZipFile(zip_stream, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in documents:
+            archive.writestr(name, data)
+    return output if output is not None else zip_stream.getvalue()
+
+
+def render_zip(template, plan, named_records, timer=NULL_TIMER, output=None):
+    """Render one PDF per ``(name, RenderRecord)`` and return them as a ZIP archive."""
+    return write_zip(render_documents(template, plan, named_records, timer), output)
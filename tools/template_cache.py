@@ -0,0 +1,92 @@
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import PyPDF2
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class TemplateEntry(object):
+    """A decoded and parsed input PDF.
+
+    ``lock`` must be held while objects are read from ``reader`` since
+    PyPDF2 resolves indirect objects lazily from a shared stream.
+    """
+
+    def __init__(self, checksum, data):
+        self.checksum = checksum
+        self.data = data
+        self.size = len(data)
+        self.lock = threading.RLock()
+        self.reader = PyPDF2.PdfFileReader(BytesIO(data))
+        self.pages = [self.reader.getPage(index) for index in range(self.reader.getNumPages())]
+
+
+class TemplateCache(object):
+    """Per-process LRU cache of parsed templates keyed by attachment checksum."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, checksum, loader):
+        """Return the entry for ``checksum``, parsing ``loader()`` on a miss."""
+        with self._lock:
+            entry = self._entries.get(checksum)
+            if entry is not None:
+                self._entries.move_to_end(checksum)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = TemplateEntry(checksum, loader())
+        with self._lock:
+            if checksum in self._entries:
+                return self._entries[checksum]
+            if entry.size <= self.max_bytes:
+                self._entries[checksum] = entry
+                self._size += entry.size
+                self._evict()
+        return entry
+
+    def discard(self, checksum):
+        with self._lock:
+            entry = self._entries.pop(checksum, None)
+            if entry is not None:
+                self._size -= entry.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def set_max_bytes(self, max_bytes):
+        if max_bytes == self.max_bytes:
+            return
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "size": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _evict(self):
+        while self._entries and self._size > self.max_bytes:
+            _checksum, entry = self._entries.popitem(last=False)
+            self._size -= entry.size
+            self.evictions += 1
+
+
+template_cache = TemplateCache()
@@ -0,0 +1,98 @@
+"""Layout of text in the box of an item.
+
+The first line keeps the baseline of the item's ``(x, y)`` point and the
+following lines go down by 1.2 times the font size. The box is ``width``
+wide from ``x``, and ``height`` tall from the top of the first line, i.e.
+``y + font size``. A width or height of 0 leaves that direction unbounded.
+Words are measured once with the glyph width tables of the face, and
+wrapping them at another size is then only arithmetic.
+"""
+import math
+
+LEADING = 1.2
+SHRINK_STEP = 0.5
+
+
+def _split_word(word, limit, glyphs):
+    """Split a word wider than ``limit`` into pieces that fit, widths in size 1000 units."""
+    pieces = []
+    piece, piece_width = "", 0.0
+    for char in word:
+        char_width = glyphs.width(char)
+        if piece and piece_width + char_width > limit:
+            pieces.append((piece, piece_width))
+            piece, piece_width = "", 0.0
+        piece += char
+        piece_width += char_width
+    if piece:
+        pieces.append((piece, piece_width))
+    return pieces
+
+
+def _wrap(paragraphs, limit, space_width, glyphs):
+    """Return the ``(line, width)`` of the measured ``paragraphs`` wrapped at ``limit``."""
+    lines = []
+    for words in paragraphs:
+        line, line_width = [], 0.0
+        for word, word_width in words:
+            pieces = _split_word(word, limit, glyphs) if word_width > limit else [(word, word_width)]
+            for piece, piece_width in pieces:
+                if line and line_width + space_width + piece_width > limit:
+                    lines.append((" ".join(line), line_width))
+                    line, line_width = [], 0.0
+                line_width += piece_width + (space_width if line else 0.0)
+                line.append(piece)
+        lines.append((" ".join(line), line_width))
+    return lines
+
+
+def _max_lines(height, font_size):
+    """Number of lines of ``font_size`` fitting in ``height``, 0 when even one line does not."""
+    if height < font_size:
+        return 0
+    return int(math.floor((height - font_size) / (font_size * LEADING))) + 1
+
+
+def layout_text(text, x, y, width, height, style, glyphs):
+    """Fit ``text`` in the box of an item drawn with ``style``.
+
+    Returns the font size to use and the ``(x, y, line, line width)`` of
+    each line to draw. Text that does not fit is wrapped at word
+    boundaries (``style.wrap``), shrunk down to ``style.min_font_size``
+    (``style.shrink``) and finally cut after the last line that fits.
+    """
+    paragraphs = text.split("\n")
+    wrap = style.wrap and width
+    if wrap:
+        space_width = glyphs.width(" ")
+        paragraphs = [[(word, glyphs.measure(word)) for word in paragraph.split()] for paragraph in paragraphs]
+    else:
+        lines = [(paragraph, glyphs.measure(paragraph)) for paragraph in paragraphs]
+
+    font_size = float(style.font_size)
+    min_font_size = min(float(style.min_font_size or font_size), font_size)
+    while True:
+        if wrap:
+            lines = _wrap(paragraphs, width * 1000.0 / font_size, space_width, glyphs)
+        fits = (
+            (not width or max(line_width for _line, line_width in lines) * font_size / 1000.0 <= width)
+            and (not height or len(lines) <= _max_lines(height, font_size))
+        )
+        if fits or not style.shrink or font_size - SHRINK_STEP < min_font_size:
+            break
+        font_size -= SHRINK_STEP
+
+    if height:
+        # the first line is printed even when it does not fit the box
+        lines = lines[:max(1, _max_lines(height, font_size))]
+    leading = font_size * LEADING
+    placed = []
+    for index, (line, line_width) in enumerate(lines):
+        line_width = line_width * font_size / 1000.0
+        line_x = x
+        if width and style.align == "center":
+            line_x = x + (width - line_width) / 2.0
+        elif width and style.align == "right":
+            line_x = x + width - line_width
+        placed.append((line_x, y - index * leading, line, line_width))
+    return font_size, placed
@@ -0,0 +1,63 @@
+import cProfile
+import marshal
+import time
+from contextlib import contextmanager
+
+
+class StageTimer(object):
+    """Accumulate the wall time spent in named stages of a print.
+
+    Stages may nest. The time of an inner stage is not counted again in
+    the stage around it, so the stage timings add up to the total.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings = {}
+        self._stack = []
+
+    @contextmanager
+    def stage(self, name):
+        frame = [time.perf_counter(), 0.0]
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - frame[0]
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed - frame[1]
+            if self._stack:
+                self._stack[-1][1] += elapsed
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+
+class _NullTimer(object):
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+
+NULL_TIMER = _NullTimer()
+
+
+@contextmanager
+def profiled(enabled):
+    """Run the block under cProfile when ``enabled`` and yield the profiler (or None)."""
+    if not enabled:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+
+
+def profile_dump(profiler):
+    """Return the stats of ``profiler`` in the ``.prof`` format read by pstats."""
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)